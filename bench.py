@@ -0,0 +1,894 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the Veterinary Dictionary Bot
+Drives the real handlers with synthetic updates against in-memory Telegram and Firestore fakes
+and reports latency percentiles and throughput per scenario and collection size.
+
+    python bench.py --sizes 100,10000 --scenarios view,search --output results.json
+    python bench.py --baseline results.json   # exits 1 if any p95 regressed
+"""
+
+import argparse
+import asyncio
+import bisect
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import string
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+BENCH_TOKEN = '123456:BENCHMARK'
+
+# Never touch the running bot's lock file, its Firebase project, persisted sessions or real token
+os.environ['BOT_LOCK_PATH'] = os.path.join(tempfile.gettempdir(), f'vetdict-bench-{os.getpid()}.lock')
+os.environ['TELEGRAM_BOT_TOKEN'] = BENCH_TOKEN
+os.environ['STORAGE_BACKEND'] = 'firestore'
+os.environ['SESSION_BACKEND'] = 'memory'
+os.environ['LEADER_ELECTION'] = 'false'
+os.environ['BOT_MODE'] = 'polling'
+os.environ['BOT_WORKER_ID'] = '0'
+# Time the inline lookup itself, not the wait for a user to stop typing
+os.environ['INLINE_DEBOUNCE_MS'] = '0'
+# Measure the handlers, not the per-user rate limits (a count of 0 turns a limit off)
+os.environ['RATE_LIMITS'] = 'stats=0/1,search=0/1,export=0/1'
+
+from google.api_core.exceptions import NotFound
+from google.cloud.firestore import Increment
+from telegram import Bot, Update
+from telegram.ext import ExtBot
+from telegram.request import BaseRequest
+
+from bot import VetDictionaryBot
+from callback_router import encode_callback
+from datastore import DOCUMENT_ID
+from repository import AUTO_ID_ALPHABET, AUTO_ID_LENGTH
+from send_queue import SendScheduler
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = '100,1000,10000,100000'
+DEFAULT_UPDATES = 100
+DEFAULT_WARMUP = 10
+# Injected latencies in milliseconds
+DEFAULT_FIRESTORE_LATENCY = 5.0
+DEFAULT_PER_DOC_LATENCY = 0.001
+DEFAULT_TELEGRAM_LATENCY = 10.0
+# Allowed p95 slowdown against a baseline before a scenario counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+# The ordering stress test fills in add forms, so it needs a collection whose fields are all free text
+ORDERING_COLLECTION = 'words'
+ORDERING_USERS = 20
+# Flood limits the fake Bot API enforces when asked to: messages per rolling second, overall and per chat
+FLOOD_GLOBAL_PER_SECOND = 30
+FLOOD_CHAT_PER_SECOND = 5
+BROADCAST_CHATS = 50
+# Rapid edits of one status message per progress chat, as a bulk import or export sends them
+BROADCAST_PROGRESS_CHATS = 5
+BROADCAST_EDITS = 20
+SYLLABLES = [consonant + vowel for consonant in 'bcdfghklmnprstvz' for vowel in 'aeiou'] + ['an', 'or', 'is', 'el']
+
+
+# --- Fake Firestore ---------------------------------------------------------------------------
+
+class FakeAggregationResult:
+    __slots__ = ('alias', 'value')
+
+    def __init__(self, alias: str, value: int):
+        self.alias = alias
+        self.value = value
+
+
+class FakeDocumentSnapshot:
+    __slots__ = ('id', 'reference', '_data')
+
+    def __init__(self, reference: 'FakeDocumentReference', data: Optional[Dict[str, Any]]):
+        self.id = reference.id
+        self.reference = reference
+        self._data = data
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeDocumentReference:
+    def __init__(self, db: 'FakeFirestore', collection: str, doc_id: str):
+        self._db = db
+        self._collection = collection
+        self.id = doc_id
+
+    def get(self) -> FakeDocumentSnapshot:
+        self._db.rpc(reads=1)
+        return FakeDocumentSnapshot(self, self._db.read(self._collection, self.id))
+
+    def set(self, data: Dict[str, Any], merge: bool = False):
+        self._db.rpc(writes=1)
+        self._db.write(self._collection, self.id, data, merge=merge)
+
+    def update(self, data: Dict[str, Any]):
+        self._db.rpc(writes=1)
+        if self._db.read(self._collection, self.id) is None:
+            raise NotFound(f"No document to update: {self._collection}/{self.id}")
+        self._db.write(self._collection, self.id, data, merge=True)
+
+    def delete(self, option: Optional[Dict[str, Any]] = None):
+        self._db.rpc(writes=1)
+        if not self._db.remove(self._collection, self.id) and option and option.get('exists'):
+            raise NotFound(f"No document to delete: {self._collection}/{self.id}")
+
+
+class FakeQuery:
+    """Immutable query over one collection, always ordered by document ID like Firestore's default"""
+
+    def __init__(self, db: 'FakeFirestore', collection: str):
+        self._db = db
+        self._collection = collection
+        self._fields: Optional[List[str]] = None
+        self._filters: Tuple[Tuple[str, Any], ...] = ()
+        self._start_after: Optional[str] = None
+        self._end_before: Optional[str] = None
+        self._limit: Optional[int] = None
+        self._last = False
+
+    def _copy(self, **changes) -> 'FakeQuery':
+        query = FakeQuery(self._db, self._collection)
+        query.__dict__.update(self.__dict__)
+        for key, value in changes.items():
+            setattr(query, f'_{key}', value)
+        return query
+
+    def document(self, doc_id: Optional[str] = None) -> FakeDocumentReference:
+        return FakeDocumentReference(self._db, self._collection, doc_id or self._db.auto_id())
+
+    def add(self, data: Dict[str, Any]):
+        reference = self.document()
+        reference.set(data)
+        return time.time(), reference
+
+    def select(self, fields: List[str]) -> 'FakeQuery':
+        return self._copy(fields=list(fields))
+
+    def order_by(self, field: str) -> 'FakeQuery':
+        if field != DOCUMENT_ID:
+            raise ValueError(f"FakeFirestore only orders by {DOCUMENT_ID}")
+        return self
+
+    def where(self, field: str, op: str, value: Any) -> 'FakeQuery':
+        if op != '==':
+            raise ValueError(f"FakeFirestore does not support '{op}' filters")
+        return self._copy(filters=self._filters + ((field, value),))
+
+    def start_after(self, values: Dict[str, str]) -> 'FakeQuery':
+        return self._copy(start_after=values[DOCUMENT_ID])
+
+    def end_before(self, values: Dict[str, str]) -> 'FakeQuery':
+        return self._copy(end_before=values[DOCUMENT_ID])
+
+    def limit(self, count: int) -> 'FakeQuery':
+        return self._copy(limit=count, last=False)
+
+    def limit_to_last(self, count: int) -> 'FakeQuery':
+        return self._copy(limit=count, last=True)
+
+    def count(self, alias: Optional[str] = None) -> 'FakeAggregationQuery':
+        return FakeAggregationQuery(self, alias or 'count')
+
+    def _ids(self) -> List[str]:
+        order = self._db.order(self._collection)
+        lo = bisect.bisect_right(order, self._start_after) if self._start_after is not None else 0
+        hi = bisect.bisect_left(order, self._end_before) if self._end_before is not None else len(order)
+        if self._filters:
+            documents = self._db.documents(self._collection)
+            ids = [doc_id for doc_id in order[lo:hi]
+                   if all(documents[doc_id].get(field) == value for field, value in self._filters)]
+        elif self._limit is None:
+            return order[lo:hi]
+        elif self._last:
+            return order[max(lo, hi - self._limit):hi]
+        else:
+            return order[lo:min(hi, lo + self._limit)]
+        if self._limit is not None:
+            ids = ids[-self._limit:] if self._last else ids[:self._limit]
+        return ids
+
+    def get(self) -> List[FakeDocumentSnapshot]:
+        with self._db.lock:
+            documents = self._db.documents(self._collection)
+            snapshots = []
+            for doc_id in self._ids():
+                data = documents[doc_id]
+                if self._fields is not None:
+                    data = {key: data[key] for key in self._fields if key in data}
+                snapshots.append(FakeDocumentSnapshot(FakeDocumentReference(self._db, self._collection, doc_id), data))
+        # Firestore bills at least one read per query, even an empty one
+        self._db.rpc(reads=max(1, len(snapshots)))
+        return snapshots
+
+    def stream(self):
+        return iter(self.get())
+
+
+class FakeAggregationQuery:
+    def __init__(self, query: FakeQuery, alias: str):
+        self._query = query
+        self._alias = alias
+
+    def get(self) -> List[List[FakeAggregationResult]]:
+        with self._query._db.lock:
+            total = len(self._query._ids())
+        # One read per 1000 index entries
+        self._query._db.rpc(reads=max(1, math.ceil(total / 1000)))
+        return [[FakeAggregationResult(self._alias, total)]]
+
+
+class FakeWriteBatch:
+    def __init__(self, db: 'FakeFirestore'):
+        self._db = db
+        self._writes: List[Tuple[FakeDocumentReference, Dict[str, Any]]] = []
+
+    def set(self, reference: FakeDocumentReference, data: Dict[str, Any]):
+        self._writes.append((reference, data))
+
+    def commit(self):
+        self._db.rpc(writes=len(self._writes))
+        for reference, data in self._writes:
+            self._db.write(reference._collection, reference.id, data)
+        self._writes = []
+
+
+class FakeFirestore:
+    """In-memory stand-in for the parts of the Firestore client the bot uses.
+
+    Every RPC sleeps for `latency` plus `per_doc_latency` per document read (seconds), on the calling
+    thread, as the blocking client does. RPCs, document reads and writes are counted.
+    """
+
+    def __init__(self, latency: float = 0.0, per_doc_latency: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.per_doc_latency = per_doc_latency
+        self.rpcs = 0
+        self.reads = 0
+        self.writes = 0
+        self.lock = threading.RLock()
+        self._documents: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._order: Dict[str, List[str]] = {}
+        self._random = random.Random(seed)
+
+    def collection(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch(self)
+
+    def write_option(self, **kwargs) -> Dict[str, Any]:
+        return kwargs
+
+    def auto_id(self) -> str:
+        with self.lock:
+            return ''.join(self._random.choices(AUTO_ID_ALPHABET, k=AUTO_ID_LENGTH))
+
+    def rpc(self, reads: int = 0, writes: int = 0):
+        with self.lock:
+            self.rpcs += 1
+            self.reads += reads
+            self.writes += writes
+        delay = self.latency + self.per_doc_latency * reads
+        if delay > 0:
+            time.sleep(delay)
+
+    def documents(self, collection: str) -> Dict[str, Dict[str, Any]]:
+        return self._documents.get(collection, {})
+
+    def order(self, collection: str) -> List[str]:
+        return self._order.get(collection, [])
+
+    def read(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            return self._documents.get(collection, {}).get(doc_id)
+
+    def write(self, collection: str, doc_id: str, data: Dict[str, Any], merge: bool = False):
+        with self.lock:
+            documents = self._documents.setdefault(collection, {})
+            current = documents.get(doc_id)
+            stored = dict(current) if merge and current is not None else {}
+            for key, value in data.items():
+                if isinstance(value, Increment):
+                    value = stored.get(key, 0) + value.value
+                stored[key] = value
+            if current is None:
+                bisect.insort(self._order.setdefault(collection, []), doc_id)
+            documents[doc_id] = stored
+
+    def remove(self, collection: str, doc_id: str) -> bool:
+        with self.lock:
+            if self._documents.get(collection, {}).pop(doc_id, None) is None:
+                return False
+            order = self._order[collection]
+            del order[bisect.bisect_left(order, doc_id)]
+            return True
+
+    def load(self, collection: str, items: List[Dict[str, Any]]) -> List[str]:
+        """Seed a collection without latency or accounting"""
+        with self.lock:
+            documents = self._documents.setdefault(collection, {})
+            doc_ids = []
+            for data in items:
+                doc_id = self.auto_id()
+                documents[doc_id] = dict(data)
+                doc_ids.append(doc_id)
+            self._order[collection] = sorted(documents)
+            return doc_ids
+
+
+# --- Fake Telegram ----------------------------------------------------------------------------
+
+class FakeTelegramRequest(BaseRequest):
+    """Answers Bot API calls locally after `latency` seconds, counting calls per API method.
+
+    With `flood_control`, sends and edits beyond the FLOOD_* limits are answered with 429 Too Many Requests.
+    """
+
+    def __init__(self, latency: float = 0.0, flood_control: bool = False):
+        self.latency = latency
+        self.flood_control = flood_control
+        self.calls: Counter = Counter()
+        self.flood_errors = 0
+        self._message_ids = itertools.count(1000)
+        self._sent: deque = deque()
+        self._sent_per_chat: Dict[Any, deque] = {}
+
+    def _flooded(self, api_method: str, parameters: Dict[str, Any]) -> bool:
+        if not api_method.startswith(('send', 'edit')):
+            return False
+        now = time.monotonic()
+        chat = self._sent_per_chat.setdefault(parameters.get('chat_id'), deque())
+        for window in (self._sent, chat):
+            while window and window[0] <= now - 1:
+                window.popleft()
+        if len(self._sent) >= FLOOD_GLOBAL_PER_SECOND or len(chat) >= FLOOD_CHAT_PER_SECOND:
+            return True
+        self._sent.append(now)
+        chat.append(now)
+        return False
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url: str, method: str, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None) -> Tuple[int, bytes]:
+        api_method = url.rsplit('/', 1)[-1]
+        self.calls[api_method] += 1
+        parameters = request_data.parameters if request_data is not None else {}
+        if self.flood_control and self._flooded(api_method, parameters):
+            self.flood_errors += 1
+            return 429, json.dumps({
+                'ok': False, 'error_code': 429, 'description': 'Too Many Requests: retry after 1',
+                'parameters': {'retry_after': 1},
+            }).encode('utf-8')
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        return 200, json.dumps({'ok': True, 'result': self._result(api_method, parameters)}).encode('utf-8')
+
+    def _result(self, api_method: str, parameters: Dict[str, Any]) -> Any:
+        if api_method == 'getMe':
+            return {'id': 123456, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+        if api_method in ('sendMessage', 'editMessageText', 'sendDocument'):
+            return {
+                'message_id': next(self._message_ids),
+                'date': int(time.time()),
+                'chat': {'id': int(parameters.get('chat_id', 0)), 'type': 'private'},
+                'text': parameters.get('text', ''),
+            }
+        return True
+
+
+class UpdateFactory:
+    """Builds real telegram.Update objects bound to the fake bot"""
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    @staticmethod
+    def _user(user_id: int) -> Dict[str, Any]:
+        return {'id': user_id, 'is_bot': False, 'first_name': f'Admin{user_id}'}
+
+    def _message(self, user_id: int, text: str) -> Dict[str, Any]:
+        return {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': self._user(user_id),
+            'text': text,
+        }
+
+    def callback(self, user_id: int, data: str) -> Update:
+        return Update.de_json({
+            'update_id': next(self._update_ids),
+            'callback_query': {
+                'id': str(next(self._update_ids)),
+                'from': self._user(user_id),
+                'chat_instance': str(user_id),
+                'data': data,
+                'message': self._message(user_id, 'Select an option:'),
+            },
+        }, self.bot)
+
+    def text(self, user_id: int, text: str) -> Update:
+        return Update.de_json({'update_id': next(self._update_ids), 'message': self._message(user_id, text)}, self.bot)
+
+    def inline(self, user_id: int, query: str, offset: str = '') -> Update:
+        return Update.de_json({
+            'update_id': next(self._update_ids),
+            'inline_query': {
+                'id': str(next(self._update_ids)),
+                'from': self._user(user_id),
+                'query': query,
+                'offset': offset,
+            },
+        }, self.bot)
+
+
+# --- Harness ----------------------------------------------------------------------------------
+
+class BenchBot(VetDictionaryBot):
+    """VetDictionaryBot wired to a FakeFirestore instead of Firebase"""
+
+    def __init__(self, db: FakeFirestore):
+        self._fake_db = db
+        super().__init__()
+
+    def _init_firebase(self):
+        return self._fake_db
+
+
+def _word(rng: random.Random) -> str:
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def _field_value(field: str, rng: random.Random) -> str:
+    if field == 'minValue':
+        return str(rng.randint(0, 50))
+    if field == 'maxValue':
+        return str(rng.randint(51, 100))
+    return ' '.join(_word(rng) for _ in range(rng.randint(1, 3)))
+
+
+def make_documents(fields: List[str], size: int, rng: random.Random) -> List[Dict[str, Any]]:
+    return [dict({field: _field_value(field, rng) for field in fields}, id=i + 1) for i in range(size)]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))]
+
+
+# A step performs one timed operation; setup runs untimed before it and returns how many updates it sent
+Step = Callable[[int, int], Awaitable[None]]
+Setup = Callable[[int, int], Awaitable[int]]
+
+
+class Harness:
+    def __init__(self, bot: BenchBot, db: FakeFirestore, request: FakeTelegramRequest, updates: UpdateFactory,
+                 collection: str, doc_ids: List[str], rng: random.Random):
+        self.bot = bot
+        self.db = db
+        self.request = request
+        self.updates = updates
+        self.collection = collection
+        self.doc_ids = doc_ids
+        self.rng = rng
+        self.fields = bot.collections[collection]['fields']
+        self.terms = self._search_terms()
+        self.prefixes = self._inline_prefixes()
+
+    def _search_terms(self) -> List[str]:
+        """Substrings of existing values (hits), misspelt words (fuzzy hits) and strings that match nothing"""
+        display_field = self.bot.collections[self.collection]['display_field']
+        documents = self.db.documents(self.collection)
+        terms = []
+        for doc_id in self.rng.sample(self.doc_ids, min(50, len(self.doc_ids))):
+            value = documents[doc_id].get(display_field, '')
+            start = self.rng.randint(0, max(0, len(value) - 3))
+            terms.append(value[start:start + self.rng.randint(3, 6)])
+            word = self.rng.choice(value.split() or [''])
+            if len(word) > 3:
+                position = self.rng.randrange(len(word))
+                terms.append(word[:position] + self.rng.choice(string.ascii_lowercase) + word[position + 1:])
+        return terms + ['qqqq', 'xyzzy']
+
+    def _inline_prefixes(self) -> List[str]:
+        """What a user has typed so far: the first few letters of existing names, plus misspellings"""
+        display_field = self.bot.collections[self.collection]['display_field']
+        documents = self.db.documents(self.collection)
+        prefixes = []
+        for doc_id in self.rng.sample(self.doc_ids, min(50, len(self.doc_ids))):
+            value = documents[doc_id].get(display_field, '')
+            prefixes.append(value[:self.rng.randint(1, 6)])
+        return prefixes + self.terms[1::2]
+
+    async def callback(self, user_id: int, data: str):
+        await self.bot.handle_callback_query(self.updates.callback(user_id, data), None)
+
+    async def text(self, user_id: int, text: str):
+        await self.bot.handle_text_message(self.updates.text(user_id, text), None)
+
+    def scenarios(self) -> Dict[str, Tuple[Optional[Setup], Step]]:
+        collection = self.collection
+
+        async def menu(user_id, i):
+            await self.callback(user_id, encode_callback('menu', 'view'))
+
+        async def view(user_id, i):
+            await self.callback(user_id, encode_callback('col', 'view', collection))
+
+        async def page(user_id, i):
+            await self.callback(user_id, encode_callback('pg', 'n', collection, self.rng.choice(self.doc_ids)))
+
+        async def stats(user_id, i):
+            await self.callback(user_id, encode_callback('stats'))
+
+        async def open_search(user_id, i):
+            await self.callback(user_id, encode_callback('col', 'search', collection))
+            return 1
+
+        async def search(user_id, i):
+            await self.text(user_id, self.terms[i % len(self.terms)])
+
+        async def search_direct(user_id, i):
+            await self.bot.search_in_collection(collection, self.terms[i % len(self.terms)])
+
+        async def inline(user_id, i):
+            prefix = self.prefixes[i % len(self.prefixes)]
+            await self.bot.handle_inline_query(self.updates.inline(user_id, prefix), None)
+
+        async def fill_add(user_id, i):
+            await self.callback(user_id, encode_callback('col', 'add', collection))
+            for field in self.fields[:-1]:
+                await self.text(user_id, _field_value(field, self.rng))
+            return len(self.fields)
+
+        async def add(user_id, i):
+            # The last field triggers validation and the write
+            await self.text(user_id, _field_value(self.fields[-1], self.rng))
+
+        return {
+            'menu': (None, menu),
+            'view': (None, view),
+            'page': (None, page),
+            'stats': (None, stats),
+            'search': (open_search, search),
+            'search_direct': (None, search_direct),
+            'inline': (None, inline),
+            'add': (fill_add, add),
+        }
+
+    async def run_scenario(self, setup: Optional[Setup], step: Step, updates: int, warmup: int,
+                           concurrency: int) -> Dict[str, float]:
+        async def worker(user_id: int, iterations: range, latencies: Optional[List[float]]) -> int:
+            sent = 0
+            for i in iterations:
+                if setup is not None:
+                    sent += await setup(user_id, i)
+                started = time.perf_counter()
+                await step(user_id, i)
+                if latencies is not None:
+                    latencies.append(time.perf_counter() - started)
+                sent += 1
+            return sent
+
+        users = [1000 + n for n in range(concurrency)]
+        await asyncio.gather(*(worker(user_id, range(warmup), None) for user_id in users))
+
+        latencies: List[float] = []
+        counters = self._counters()
+        started = time.perf_counter()
+        sent = await asyncio.gather(*(
+            worker(user_id, range(n, updates, concurrency), latencies) for n, user_id in enumerate(users)
+        ))
+        return self._summary(latencies, sum(sent), time.perf_counter() - started, counters)
+
+    def _counters(self) -> Tuple[int, int, int]:
+        return self.db.reads, self.db.rpcs, sum(self.request.calls.values())
+
+    def _summary(self, latencies: List[float], sent: int, elapsed: float,
+                 counters: Tuple[int, int, int]) -> Dict[str, float]:
+        reads, rpcs, telegram = counters
+        latencies.sort()
+        return {
+            'n': len(latencies),
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'max_ms': latencies[-1] * 1000 if latencies else 0.0,
+            'updates_per_sec': sent / elapsed if elapsed > 0 else 0.0,
+            'reads_per_op': (self.db.reads - reads) / max(1, len(latencies)),
+            'rpcs_per_op': (self.db.rpcs - rpcs) / max(1, len(latencies)),
+            'telegram_per_op': (sum(self.request.calls.values()) - telegram) / max(1, len(latencies)),
+        }
+
+
+    async def run_ordering(self, updates: int) -> Dict[str, float]:
+        """Stress test for per-user ordering through the bot's update processor.
+
+        ORDERING_USERS admins each fire off whole add forms (menu tap plus every field) without waiting for
+        replies, and their updates arrive randomly interleaved. Every field value names its user, form and field,
+        so afterwards each form must have been saved exactly once with every value in its own field.
+        """
+        collection = ORDERING_COLLECTION
+        fields = self.bot.collections[collection]['fields']
+        forms = max(1, round(updates / (ORDERING_USERS * (len(fields) + 1))))
+
+        def value(user_id: int, form: int, field: str) -> str:
+            return f"order u{user_id} f{form} {field}"
+
+        streams = []
+        for user_id in range(5000, 5000 + ORDERING_USERS):
+            stream = []
+            for form in range(forms):
+                stream.append(self.updates.callback(user_id, encode_callback('col', 'add', collection)))
+                stream.extend(self.updates.text(user_id, value(user_id, form, field)) for field in fields)
+            streams.append(stream)
+        # Random interleaving that keeps each user's own updates in the order they were sent
+        arrivals = [stream for stream in streams for _ in stream]
+        self.rng.shuffle(arrivals)
+        arrivals = [stream.pop(0) for stream in arrivals]
+
+        async def dispatch(update: Update):
+            if update.callback_query is not None:
+                await self.bot.handle_callback_query(update, None)
+            else:
+                await self.bot.handle_text_message(update, None)
+
+        latencies: List[float] = []
+
+        async def process(update: Update):
+            queued = time.perf_counter()
+            await self.bot.update_processor.process_update(update, dispatch(update))
+            latencies.append(time.perf_counter() - queued)
+
+        counters = self._counters()
+        started = time.perf_counter()
+        # Like Application does with concurrent updates: one task per update, created in arrival order
+        await asyncio.gather(*(asyncio.create_task(process(update)) for update in arrivals))
+        elapsed = time.perf_counter() - started
+
+        saved: Dict[str, List[Dict[str, Any]]] = {}
+        for data in self.db.documents(collection).values():
+            name = data.get('name', '')
+            if name.startswith('order '):
+                saved.setdefault(name, []).append(data)
+        failures = 0
+        for user_id in range(5000, 5000 + ORDERING_USERS):
+            for form in range(forms):
+                documents = saved.get(value(user_id, form, 'name'), [])
+                correct = len(documents) == 1 and all(
+                    documents[0].get(field) == value(user_id, form, field) for field in fields
+                )
+                if not correct:
+                    failures += 1
+                    logger.error(f"Form {form} of user {user_id} lost or reordered: {documents}")
+
+        return dict(self._summary(latencies, len(arrivals), elapsed, counters), ordering_errors=failures)
+
+
+    async def run_broadcast(self, updates: int) -> Dict[str, float]:
+        """Outbound flood control: messages fanned out to many chats plus bursts of status-message edits,
+        sent through the bot's SendScheduler to a fake Bot API that answers 429 past Telegram's limits"""
+        request = FakeTelegramRequest(self.request.latency, flood_control=True)
+        bot = ExtBot(BENCH_TOKEN, request=request, rate_limiter=SendScheduler())
+        await bot.initialize()
+        latencies: List[float] = []
+        failures = 0
+
+        async def timed(call: Awaitable[Any]):
+            nonlocal failures
+            started = time.perf_counter()
+            try:
+                await call
+            except Exception as e:
+                failures += 1
+                logger.error(f"Broadcast request failed: {e}")
+            latencies.append(time.perf_counter() - started)
+
+        async def progress(chat_id: int):
+            nonlocal failures
+            try:
+                message = await bot.send_message(chat_id, "⏳ Importing...")
+            except Exception as e:
+                failures += 1
+                logger.error(f"Broadcast request failed: {e}")
+                return
+            # Fired without waiting, like progress updates from a fast import loop
+            await asyncio.gather(*(
+                timed(bot.edit_message_text(f"⏳ Importing... {step + 1}/{BROADCAST_EDITS}", chat_id,
+                                            message.message_id))
+                for step in range(BROADCAST_EDITS)
+            ))
+
+        counters = self._counters()
+        try:
+            sent_before = sum(request.calls.values())
+            started = time.perf_counter()
+            await asyncio.gather(
+                *(timed(bot.send_message(7000 + i % BROADCAST_CHATS, f"Notification {i}")) for i in range(updates)),
+                *(progress(8000 + i) for i in range(BROADCAST_PROGRESS_CHATS))
+            )
+            elapsed = time.perf_counter() - started
+            api_calls = sum(request.calls.values()) - sent_before
+        finally:
+            await bot.shutdown()
+
+        summary = self._summary(latencies, len(latencies), elapsed, counters)
+        summary['telegram_per_op'] = api_calls / max(1, len(latencies))
+        return dict(summary, flood_errors=request.flood_errors, send_failures=failures)
+
+
+async def bench_size(args, size: int) -> List[Dict[str, Any]]:
+    rng = random.Random(args.seed)
+    db = FakeFirestore(seed=args.seed)
+    bot = BenchBot(db)
+    request = FakeTelegramRequest(args.telegram_latency / 1000)
+    telegram_bot = Bot(BENCH_TOKEN, request=request)
+    results = []
+    try:
+        if args.collection not in bot.collections:
+            raise SystemExit(f"Unknown collection {args.collection}; choose from {', '.join(bot.collections)}")
+        doc_ids = db.load(args.collection, make_documents(bot.collections[args.collection]['fields'], size, rng))
+
+        # Mirror startup: listeners load the search index and live counts before updates arrive
+        if args.index:
+            bot.search_index.build_all()
+        if args.live_stats:
+            for collection in bot.collections:
+                bot.stats_service.on_snapshot(collection, db.order(collection), [], None)
+        bot.stats_service.bind(asyncio.get_running_loop())
+
+        db.latency = args.firestore_latency / 1000
+        db.per_doc_latency = args.per_doc_latency / 1000
+        await telegram_bot.initialize()
+        harness = Harness(bot, db, request, UpdateFactory(telegram_bot), args.collection, doc_ids, rng)
+
+        scenarios = harness.scenarios()
+        for name in args.scenarios:
+            if name == 'ordering':
+                result = await harness.run_ordering(args.updates)
+            elif name == 'broadcast':
+                result = await harness.run_broadcast(args.updates)
+            else:
+                setup, step = scenarios[name]
+                result = await harness.run_scenario(setup, step, args.updates, args.warmup, args.concurrency)
+            results.append(dict(result, scenario=name, docs=size))
+            print(format_row(results[-1]), flush=True)
+    finally:
+        await telegram_bot.shutdown()
+        bot.store.shutdown()
+        bot.sessions.close()
+        bot.instance_lock.release()
+    return results
+
+
+HEADER = (f"{'scenario':<14}{'docs':>8}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+          f"{'upd/s':>9}{'reads/op':>10}{'tg/op':>7}")
+
+
+def format_row(row: Dict[str, Any]) -> str:
+    return (f"{row['scenario']:<14}{row['docs']:>8}{row['n']:>6}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+            f"{row['p99_ms']:>10.2f}{row['max_ms']:>10.2f}{row['updates_per_sec']:>9.1f}"
+            f"{row['reads_per_op']:>10.2f}{row['telegram_per_op']:>7.1f}")
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> List[str]:
+    """Scenarios whose p95 grew by more than `tolerance` against a saved run"""
+    with open(baseline_path, 'r') as f:
+        baseline = {(row['scenario'], row['docs']): row for row in json.load(f)['results']}
+    regressions = []
+    for row in results:
+        previous = baseline.get((row['scenario'], row['docs']))
+        if previous and row['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(
+                f"{row['scenario']} @ {row['docs']} docs: p95 {previous['p95_ms']:.2f} -> {row['p95_ms']:.2f} ms"
+            )
+    return regressions
+
+
+def parse_args(argv=None):
+    scenario_names = ['menu', 'view', 'page', 'stats', 'search', 'search_direct', 'inline', 'add', 'ordering', 'broadcast']
+    parser = argparse.ArgumentParser(description="Benchmark VetDictionaryBot handlers against fake Telegram/Firestore")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help=f"collection sizes (default {DEFAULT_SIZES})")
+    parser.add_argument('--collection', default='words', help="collection the scenarios use (default words)")
+    parser.add_argument('--scenarios', default=','.join(scenario_names),
+                        help=f"comma-separated subset of {', '.join(scenario_names)}")
+    parser.add_argument('--updates', type=int, default=DEFAULT_UPDATES, help="measured operations per scenario")
+    parser.add_argument('--warmup', type=int, default=DEFAULT_WARMUP, help="unmeasured operations per user first")
+    parser.add_argument('--concurrency', type=int, default=1, help="simulated admins sending updates at once")
+    parser.add_argument('--firestore-latency', type=float, default=DEFAULT_FIRESTORE_LATENCY, help="ms per RPC")
+    parser.add_argument('--per-doc-latency', type=float, default=DEFAULT_PER_DOC_LATENCY, help="ms per document read")
+    parser.add_argument('--telegram-latency', type=float, default=DEFAULT_TELEGRAM_LATENCY, help="ms per Bot API call")
+    parser.add_argument('--no-index', dest='index', action='store_false', help="search without the n-gram index")
+    parser.add_argument('--no-live-stats', dest='live_stats', action='store_false',
+                        help="count with aggregation queries instead of listener state")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write results as JSON")
+    parser.add_argument('--baseline', help="JSON from an earlier --output run to check for p95 regressions")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f"allowed p95 slowdown vs baseline (default {DEFAULT_TOLERANCE})")
+    parser.add_argument('--verbose', action='store_true', help="keep the bot's INFO logging")
+    args = parser.parse_args(argv)
+
+    args.sizes = [int(size) for size in args.sizes.split(',') if size]
+    args.scenarios = [name for name in args.scenarios.split(',') if name]
+    unknown = set(args.scenarios) - set(scenario_names)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    return args
+
+
+async def run_benchmarks(args) -> List[Dict[str, Any]]:
+    results = []
+    print(HEADER)
+    for size in args.sizes:
+        results.extend(await bench_size(args, size))
+    return results
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    results = asyncio.run(run_benchmarks(args))
+
+    if args.output:
+        config = {key: value for key, value in vars(args).items() if key not in ('output', 'baseline', 'verbose')}
+        with open(args.output, 'w') as f:
+            json.dump({'config': config, 'results': results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    failed = [row for row in results if row.get('ordering_errors')]
+    for row in failed:
+        print(f"ORDERING FAILURE @ {row['docs']} docs: {row['ordering_errors']} forms lost or reordered")
+    for row in results:
+        if 'flood_errors' in row:
+            print(f"broadcast @ {row['docs']} docs: {row['flood_errors']} 429 responses, "
+                  f"{row['send_failures']} failed sends")
+    failed += [row for row in results if row.get('send_failures')]
+    if failed:
+        return 1
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No p95 regressions beyond {args.tolerance:.0%} of {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,20 +4,64 @@ Veterinary Dictionary Telegram Bot
 Complete standalone admin bot for managing veterinary content
 """
 
+import asyncio
 import logging
 import os
 import json
-from typing import Dict, Any
+import itertools
+import math
+import tempfile
+from typing import Dict
 from datetime import datetime
 
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes
+from telegram import (
+    Update, InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle, InputTextMessageContent
+)
+from telegram.ext import (
+    Application, CommandHandler, CallbackQueryHandler, InlineQueryHandler, MessageHandler, filters, ContextTypes
+)
 from dotenv import load_dotenv
 from firebase_admin import credentials, firestore, initialize_app
 
+from callback_router import CallbackRouter, StaleCallbackError, encode_callback
+from bulk_import import BATCH_SIZE, ImportReport, iter_rows, normalize_row
+from datastore import FirestoreStore
+from export import EXPORT_FORMATS, MAX_UPLOAD_BYTES, export_collection
+from ids import IdGenerator, default_worker_id
+from inline_search import PAGE_SIZE, Debouncer, InlineSearch
+from instance_lock import InstanceLock, LeaderLease
+from listeners import CollectionWatcher
+from metrics import MetricsServer, callback_metric, install_error_counter, track_handler
+from schema import REQUIRED, compile_schemas, format_errors
+from search_index import SearchIndex, rank_results
+from send_queue import SendScheduler
+from sessions import Session, create_session_store
+from sqlite_repository import SQLiteRepository
+from stats_service import StatsService
+from throttle import RateLimiter, SingleFlight, parse_limits
+from update_processor import DEFAULT_MAX_CONCURRENT, PerUserUpdateProcessor
+
 # Load environment variables
 load_dotenv()
 
+# Items shown per page when viewing a collection
+VIEW_PAGE_SIZE = 5
+# Actions that open the "pick a collection" menu, with the prompt shown above it
+COLLECTION_ACTIONS = {
+    'add': "Select a collection to add:",
+    'view': "Select a collection to view:",
+    'edit': "Select a collection to edit:",
+    'delete': "Select a collection to delete:",
+    'search': "Select a collection to search:",
+    'import': "Select a collection to import into:",
+}
+
+# Inline mode: wait this long for the user to stop typing, and let clients cache answers this long (seconds)
+INLINE_DEBOUNCE = float(os.getenv('INLINE_DEBOUNCE_MS', '250')) / 1000
+INLINE_CACHE_TIME = int(os.getenv('INLINE_CACHE_TIME', '300'))
+INLINE_DESCRIPTION_LENGTH = 100
+INLINE_MESSAGE_LENGTH = 4096
+
 # Configure logging
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -27,21 +71,30 @@ logger = logging.getLogger(__name__)
 
 class VetDictionaryBot:
     def __init__(self):
-        # Check for existing instance
-        self.lock_file = os.path.join(os.path.dirname(__file__), 'bot.lock')
-        if os.path.exists(self.lock_file):
-            raise RuntimeError("Another bot instance is already running")
-        open(self.lock_file, 'w').close()
+        # Check for existing instance (the kernel drops the lock if the process dies)
+        lock_path = os.getenv('BOT_LOCK_PATH', os.path.join(os.path.dirname(__file__), 'bot.lock'))
+        self.instance_lock = InstanceLock(lock_path)
+        self.instance_lock.acquire()
         
         self.bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
         if not self.bot_token:
             raise ValueError("TELEGRAM_BOT_TOKEN environment variable is required")
         
-        # User sessions for maintaining state
-        self.user_sessions: Dict[int, Dict[str, Any]] = {}
+        # User sessions for maintaining state (bounded, idle-expiring, optionally persisted)
+        self.sessions = create_session_store()
 
+        # Storage backend: Firestore (default) or a local SQLite file for offline use
+        self.storage_backend = os.getenv('STORAGE_BACKEND', 'firestore').lower()
+        # Numeric `id` values for new items. Webhook deployments and leader-election standbys may run several
+        # instances that write, so they must each be given a distinct BOT_WORKER_ID
+        multi_instance = (
+            os.getenv('BOT_MODE', 'polling').lower() == 'webhook'
+            or os.getenv('LEADER_ELECTION', 'false').lower() == 'true'
+        )
+        self.id_generator = IdGenerator(default_worker_id(required=multi_instance))
+        
         # Initialize Firebase (Firestore)
-        self.db = self._init_firebase()
+        self.db = self._init_firebase() if self.storage_backend == 'firestore' else None
         
         # Collection configurations
         self.collections = {
@@ -49,74 +102,195 @@ class VetDictionaryBot:
                 'name': 'Books',
                 'emoji': '📚',
                 'fields': ['title', 'description', 'category', 'coverImageUrl', 'pdfUrl'],
+                'display_field': 'title',
+                'schema': {
+                    'title': {'required': True},
+                    'description': {'required': True},
+                    'coverImageUrl': {'type': 'url'},
+                    'pdfUrl': {'type': 'url'},
+                },
                 'description': 'Manage veterinary books and publications'
             },
             'words': {
                 'name': 'Dictionary',
                 'emoji': '📖',
                 'fields': ['name', 'kurdish', 'arabic', 'description'],
+                'display_field': 'name',
+                'prefix_fields': ['name', 'kurdish', 'arabic'],
+                'schema': {'name': REQUIRED, 'kurdish': REQUIRED, 'arabic': REQUIRED},
                 'description': 'Manage veterinary dictionary terms'
             },
             'diseases': {
                 'name': 'Diseases',
                 'emoji': '🦠',
                 'fields': ['name', 'kurdish', 'symptoms', 'cause', 'control'],
+                'display_field': 'name',
+                'prefix_fields': ['name', 'kurdish'],
+                'schema': {'name': REQUIRED, 'symptoms': REQUIRED},
                 'description': 'Manage animal diseases and conditions'
             },
             'drugs': {
                 'name': 'Drugs',
                 'emoji': '💊',
                 'fields': ['name', 'usage', 'sideEffect', 'otherInfo', 'class'],
+                'display_field': 'name',
+                'prefix_fields': ['name'],
+                'schema': {'name': REQUIRED, 'usage': REQUIRED, 'class': {'default': 'General'}},
                 'description': 'Manage veterinary medications'
             },
             'tutorialVideos': {
                 'name': 'Tutorial Videos',
                 'emoji': '🎥',
                 'fields': ['Title', 'VideoID'],
+                'display_field': 'Title',
+                'schema': {'Title': REQUIRED, 'VideoID': REQUIRED},
                 'description': 'Manage educational videos'
             },
             'staff': {
                 'name': 'Staff',
                 'emoji': '👥',
                 'fields': ['name', 'job', 'description', 'photo', 'facebook', 'instagram', 'snapchat', 'twitter'],
+                'display_field': 'name',
+                'schema': {'name': REQUIRED, 'job': REQUIRED, 'photo': {'type': 'url'}},
                 'description': 'Manage staff members'
             },
             'questions': {
                 'name': 'Questions',
                 'emoji': '❓',
                 'fields': ['text', 'userName', 'userEmail', 'likes'],
+                'display_field': 'text',
+                'schema': {'userEmail': {'type': 'email'}, 'likes': {'type': 'int', 'min': 0}},
                 'description': 'Manage user questions'
             },
             'notifications': {
                 'name': 'Notifications',
                 'emoji': '📱',
                 'fields': ['title', 'body', 'imageUrl'],
+                'display_field': 'title',
+                'schema': {'title': REQUIRED, 'body': REQUIRED, 'imageUrl': {'type': 'url'}},
                 'description': 'Manage system notifications'
             },
             'users': {
                 'name': 'Users',
                 'emoji': '👤',
                 'fields': ['username', 'today_points', 'total_points'],
+                'display_field': 'username',
+                'schema': {
+                    'username': REQUIRED,
+                    'today_points': {'type': 'int', 'min': 0},
+                    'total_points': {'type': 'int', 'min': 0},
+                },
                 'description': 'Manage application users'
             },
             'normalRanges': {
                 'name': 'Normal Ranges',
                 'emoji': '📊',
                 'fields': ['name', 'unit', 'minValue', 'maxValue', 'species', 'category'],
+                'display_field': 'name',
+                'schema': {
+                    'name': REQUIRED,
+                    'unit': REQUIRED,
+                    'minValue': {'type': 'float', 'required': True, 'less_than': 'maxValue'},
+                    'maxValue': {'type': 'float', 'required': True},
+                },
                 'description': 'Manage normal reference ranges'
             },
             'appLinks': {
                 'name': 'App Links',
                 'emoji': '🔗',
                 'fields': ['url'],
+                'display_field': 'url',
+                'schema': {'url': {'type': 'url', 'required': True}},
                 'description': 'Manage application download links'
             }
         }
+        
+        # Field rules compiled once; every add, edit and import row is validated and coerced through them
+        self.schemas = compile_schemas(self.collections)
+
+        # Button presses are dispatched through a route table keyed by the payload's route
+        self.router = self._build_router()
+
+        # Menus are static, so they are built once and shared by every reply
+        self._keyboards: Dict[str, InlineKeyboardMarkup] = {}
+        self.build_keyboards()
 
-    def __del__(self):
-        # Cleanup lock file
-        if hasattr(self, 'lock_file') and os.path.exists(self.lock_file):
-            os.remove(self.lock_file)
+        # Repository used by every handler; blocking calls run on a bounded thread pool, off the event loop
+        self.store = self._init_store()
+
+        # Optional lease-based leader election so a warm standby can take over polling
+        leader_election = os.getenv('LEADER_ELECTION', 'false').lower() == 'true'
+        if leader_election and not self.db:
+            logger.warning("LEADER_ELECTION requires Firebase; running without leader election")
+        self.leader = LeaderLease(self.db, float(os.getenv('LEADER_LEASE_TTL', '10'))) if leader_election and self.db else None
+
+        # In-memory n-gram index answering searches without touching Firestore
+        self.search_index = SearchIndex(self.db, self.collections) if self.db else None
+        
+        # Inline mode (`@bot term`) over the collections with prefix fields, answered only from the index
+        inline_collections = ['words', 'drugs', 'diseases']
+        self.inline_search = InlineSearch(self.search_index, inline_collections) if self.search_index else None
+        self.inline_debouncer = Debouncer(INLINE_DEBOUNCE)
+
+        # One snapshot listener per collection feeds the search index and live statistics
+        self.watcher = CollectionWatcher(self.db, self.collections) if self.db else None
+        self.stats_service = StatsService(self.collections)
+
+        # Updates from different admins run concurrently; each admin's updates still run in order
+        self.update_processor = PerUserUpdateProcessor(int(os.getenv('MAX_CONCURRENT_UPDATES', DEFAULT_MAX_CONCURRENT)))
+        
+        # Per-user rate limits for Firestore-heavy actions, a cap on concurrent expensive reads,
+        # and single-flight so identical reads already in progress are shared rather than repeated
+        self.rate_limiter = RateLimiter(parse_limits(os.getenv('RATE_LIMITS')))
+        self.expensive_reads = asyncio.Semaphore(int(os.getenv('MAX_EXPENSIVE_READS', '4')))
+        self.single_flight = SingleFlight()
+        
+        # Prometheus-style metrics, served on a local port once the application starts
+        self.metrics_server = None
+        self.webhook_server = None
+        self._register_metrics()
+
+    def _register_metrics(self):
+        """Expose live bot state to the metrics endpoint; read at scrape time, so nothing is kept in sync"""
+        install_error_counter()
+        callback_metric('vetdict_active_sessions', "Sessions currently held in memory", lambda: len(self.sessions))
+        callback_metric('vetdict_updates_running', "Updates being handled right now",
+                        lambda: self.update_processor.active)
+        callback_metric('vetdict_updates_waiting', "Updates whose user is free but waiting for a running slot",
+                        lambda: self.update_processor.waiting)
+        callback_metric('vetdict_update_queued_users', "Users with an update running or waiting",
+                        lambda: self.update_processor.queued_users)
+        
+        def route_stats(attribute: str):
+            return [((route,), getattr(stats, attribute)) for route, stats in self.router.stats.items()]
+        
+        callback_metric('vetdict_callback_route_calls_total', "Button presses dispatched per callback route",
+                        lambda: route_stats('calls'), ['route'], 'counter')
+        callback_metric('vetdict_callback_route_errors_total', "Callback route handlers that raised",
+                        lambda: route_stats('errors'), ['route'], 'counter')
+        callback_metric('vetdict_callback_route_seconds_total', "Time spent in each callback route",
+                        lambda: route_stats('total'), ['route'], 'counter')
+        
+        cache = getattr(self.store, 'cache', None)
+        if cache is not None:
+            callback_metric('vetdict_cache_hit_ratio', "Collection cache hits / lookups", lambda: cache.hit_ratio)
+            callback_metric('vetdict_cache_lookups_total', "Collection cache lookups by result",
+                            lambda: [(('hit',), cache.hits), (('miss',), cache.misses)], ['result'], 'counter')
+            callback_metric('vetdict_cache_evictions_total', "Collection cache LRU evictions",
+                            lambda: cache.evictions, metric_type='counter')
+        
+        inline = self.inline_search
+        if inline is not None:
+            callback_metric('vetdict_inline_cache_lookups_total', "Inline query result cache lookups by result",
+                            lambda: [(('hit',), inline.hits), (('miss',), inline.misses)], ['result'], 'counter')
+
+    def _init_store(self):
+        """Create the repository for the configured STORAGE_BACKEND, or None if unavailable"""
+        if self.storage_backend == 'sqlite':
+            path = os.getenv('SQLITE_DB_PATH', os.path.join(os.path.dirname(__file__), 'vetdict.db'))
+            logger.info(f"Using SQLite storage at {path}")
+            return SQLiteRepository(path, {key: info['fields'] for key, info in self.collections.items()})
+        return FirestoreStore(self.db) if self.db else None
 
     def _init_firebase(self):
         """Initialize Firebase Firestore client from serviceAccount.json file.
@@ -192,14 +366,15 @@ class VetDictionaryBot:
             logger.error(f"Failed to initialize Firebase: {e}")
             return None
 
-    def get_session(self, user_id: int) -> Dict[str, Any]:
-        if user_id not in self.user_sessions:
-            self.user_sessions[user_id] = {}
-        return self.user_sessions[user_id]
+    def get_session(self, user_id: int) -> Session:
+        return self.sessions.get(user_id)
 
     def clear_session(self, user_id: int):
-        if user_id in self.user_sessions:
-            self.user_sessions[user_id] = {}
+        self.sessions.clear(user_id)
+
+    def save_session(self, user_id: int):
+        """Write the session through to the backend once the update has been handled"""
+        self.sessions.save(user_id)
 
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id = update.effective_user.id
@@ -226,7 +401,11 @@ class VetDictionaryBot:
             "/menu - Show main menu\n"
             "/stats - View statistics\n"
             "/collections - List all collections\n"
-            "/help - Show this help message"
+            "/export <collection> [ndjson|csv] - Download a collection as a .gz file\n"
+            "/help - Show this help message\n\n"
+            "📥 Bulk Import: choose a collection from the menu, then send a "
+            "CSV, JSON, NDJSON or XLSX file whose columns match the collection's fields.\n\n"
+            "🔎 Inline: type @<bot username> and a term in any chat to look up words, drugs and diseases."
         )
         await update.message.reply_text(help_text)
 
@@ -237,9 +416,16 @@ class VetDictionaryBot:
         )
 
     async def collections_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        # Same full-collection counts as the statistics, so they share the 'stats' limit
+        wait = self.rate_limiter.check('stats', update.effective_user.id)
+        if wait:
+            await update.message.reply_text(self.rate_limited_text(wait))
+            return
+        
         collections_text = "📋 Available Collections:\n\n"
+        counts = await self.get_collection_counts()
         for key, info in self.collections.items():
-            count = self.get_collection_count(key)
+            count = counts.get(key, 0)
             collections_text += f"{info['emoji']} {info['name']} ({count} items)\n"
             collections_text += f"   {info['description']}\n\n"
         
@@ -248,26 +434,112 @@ class VetDictionaryBot:
     async def stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         await self.show_statistics(update)
 
+    async def export_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        args = context.args or []
+        collection = args[0] if args else None
+        fmt = args[1].lower() if len(args) > 1 else 'ndjson'
+        
+        if collection not in self.collections or fmt not in EXPORT_FORMATS:
+            await update.message.reply_text(
+                "Usage: /export <collection> [ndjson|csv]\n\n"
+                f"Collections: {', '.join(self.collections)}"
+            )
+            return
+        
+        if not self.store:
+            await update.message.reply_text("❌ Database not initialized. Cannot export data.")
+            return
+        
+        wait = self.rate_limiter.check('export', update.effective_user.id)
+        if wait:
+            await update.message.reply_text(self.rate_limited_text(wait))
+            return
+        
+        # Large exports take a while; run them as a task so other updates keep being handled
+        context.application.create_task(self.send_export(update, collection, fmt), update=update)
+
+    async def send_export(self, update: Update, collection: str, fmt: str):
+        collection_info = self.collections[collection]
+        status = await update.message.reply_text(f"⏳ Exporting {collection_info['name']} as {fmt}...")
+        path = None
+        
+        try:
+            async with self.expensive_reads:
+                path, rows = await export_collection(self.store, collection, collection_info['fields'], fmt)
+            size = os.path.getsize(path)
+            if size > MAX_UPLOAD_BYTES:
+                await status.edit_text(f"❌ Export is {size // (1024 * 1024)} MB, over Telegram's 50 MB upload limit.")
+                return
+            
+            filename = f"{collection}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{fmt}.gz"
+            with open(path, 'rb') as f:
+                await update.message.reply_document(
+                    document=f,
+                    filename=filename,
+                    caption=f"📤 {collection_info['name']}: {rows} items"
+                )
+            await status.delete()
+            logger.info(f"Exported {rows} {collection} items ({size} bytes)")
+        except Exception as e:
+            logger.error(f"Export of {collection} failed: {e}", exc_info=True)
+            await status.edit_text(f"❌ Export error: {str(e)}")
+        finally:
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    def build_keyboards(self):
+        """Precompute the static menus; call again (or invalidate_keyboards) whenever self.collections changes"""
+        keyboards = {
+            'main': self._build_main_menu_keyboard(),
+            'back': self._build_back_to_menu_keyboard(),
+        }
+        for action in COLLECTION_ACTIONS:
+            keyboards[f'collections_{action}'] = self._build_collection_menu_keyboard(action)
+        self._keyboards = keyboards
+
+    def invalidate_keyboards(self):
+        self._keyboards = {}
+
     def get_main_menu_keyboard(self) -> InlineKeyboardMarkup:
+        keyboard = self._keyboards.get('main')
+        if keyboard is None:
+            keyboard = self._keyboards['main'] = self._build_main_menu_keyboard()
+        return keyboard
+
+    def get_collection_menu_keyboard(self, action: str) -> InlineKeyboardMarkup:
+        key = f'collections_{action}'
+        keyboard = self._keyboards.get(key)
+        if keyboard is None:
+            keyboard = self._keyboards[key] = self._build_collection_menu_keyboard(action)
+        return keyboard
+
+    def get_back_to_menu_keyboard(self) -> InlineKeyboardMarkup:
+        keyboard = self._keyboards.get('back')
+        if keyboard is None:
+            keyboard = self._keyboards['back'] = self._build_back_to_menu_keyboard()
+        return keyboard
+
+    def _build_main_menu_keyboard(self) -> InlineKeyboardMarkup:
         keyboard = [
-            [InlineKeyboardButton("➕ Add Content", callback_data="menu_add")],
-            [InlineKeyboardButton("👁️ View Content", callback_data="menu_view")],
-            [InlineKeyboardButton("🔍 Search Content", callback_data="menu_search")],
-            [InlineKeyboardButton("✏️ Edit Content", callback_data="menu_edit")],
-            [InlineKeyboardButton("🗑️ Delete Content", callback_data="menu_delete")],
-            [InlineKeyboardButton("📊 Statistics", callback_data="menu_stats")],
-            [InlineKeyboardButton("📋 Collections Info", callback_data="menu_collections")]
+            [InlineKeyboardButton("➕ Add Content", callback_data=encode_callback("menu", "add"))],
+            [InlineKeyboardButton("👁️ View Content", callback_data=encode_callback("menu", "view"))],
+            [InlineKeyboardButton("🔍 Search Content", callback_data=encode_callback("menu", "search"))],
+            [InlineKeyboardButton("✏️ Edit Content", callback_data=encode_callback("menu", "edit"))],
+            [InlineKeyboardButton("🗑️ Delete Content", callback_data=encode_callback("menu", "delete"))],
+            [InlineKeyboardButton("📥 Bulk Import", callback_data=encode_callback("menu", "import"))],
+            [InlineKeyboardButton("📊 Statistics", callback_data=encode_callback("stats"))],
+            [InlineKeyboardButton("📋 Collections Info", callback_data=encode_callback("info"))]
         ]
         return InlineKeyboardMarkup(keyboard)
 
-    def get_collection_menu_keyboard(self, action: str) -> InlineKeyboardMarkup:
+    def _build_collection_menu_keyboard(self, action: str) -> InlineKeyboardMarkup:
         keyboard = []
         row = []
         
         for i, (collection_key, collection_info) in enumerate(self.collections.items()):
             button = InlineKeyboardButton(
                 f"{collection_info['emoji']} {collection_info['name']}",
-                callback_data=f"{action}_{collection_key}"
+                callback_data=encode_callback("col", action, collection_key)
             )
             row.append(button)
             
@@ -275,73 +547,29 @@ class VetDictionaryBot:
                 keyboard.append(row)
                 row = []
         
-        keyboard.append([InlineKeyboardButton("« Back to Menu", callback_data="back_to_menu")])
+        keyboard.append([InlineKeyboardButton("« Back to Menu", callback_data=encode_callback("home"))])
         return InlineKeyboardMarkup(keyboard)
 
-    def get_back_to_menu_keyboard(self) -> InlineKeyboardMarkup:
-        keyboard = [[InlineKeyboardButton("« Back to Menu", callback_data="back_to_menu")]]
+    def _build_back_to_menu_keyboard(self) -> InlineKeyboardMarkup:
+        keyboard = [[InlineKeyboardButton("« Back to Menu", callback_data=encode_callback("home"))]]
         return InlineKeyboardMarkup(keyboard)
 
+    def _build_router(self) -> CallbackRouter:
+        router = CallbackRouter(on_unknown=self.handle_unknown_callback)
+        router.register("home", self.show_main_menu_callback)
+        router.register("menu", self.show_collection_menu_callback, arity=1)
+        router.register("stats", self.show_statistics_callback)
+        router.register("info", self.show_collections_info_callback)
+        router.register("col", self.handle_collection_action, arity=2)
+        router.register("pg", self.show_collection_data_callback, arity=3)
+        return router
+
     async def handle_callback_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
-        data = query.data
         
         try:
             await query.answer()
-            
-            # === Main menu buttons ===
-            if data == "back_to_menu":
-                await query.edit_message_text(
-                    "Select an option:",
-                    reply_markup=self.get_main_menu_keyboard()
-                )
-            elif data == "menu_add":
-                await query.edit_message_text(
-                    "Select a collection to add:",
-                    reply_markup=self.get_collection_menu_keyboard("add")
-                )
-            elif data == "menu_view":
-                await query.edit_message_text(
-                    "Select a collection to view:",
-                    reply_markup=self.get_collection_menu_keyboard("view")
-                )
-            elif data == "menu_edit":
-                await query.edit_message_text(
-                    "Select a collection to edit:",
-                    reply_markup=self.get_collection_menu_keyboard("edit")
-                )
-            elif data == "menu_delete":
-                await query.edit_message_text(
-                    "Select a collection to delete:",
-                    reply_markup=self.get_collection_menu_keyboard("delete")
-                )
-            elif data == "menu_search":
-                await query.edit_message_text(
-                    "Select a collection to search:",
-                    reply_markup=self.get_collection_menu_keyboard("search")
-                )
-            elif data == "menu_stats":
-                await self.show_statistics_callback(query)
-            elif data == "menu_collections":
-                await self.show_collections_info_callback(query)
-            # === Collection-specific actions (e.g. add_books) ===
-            elif data.startswith(("add_", "view_", "edit_", "delete_", "search_")):
-                await self.handle_collection_action(query, data)
-            else:
-                logger.warning(f"Unknown button action received: {data}")
-                if update.effective_message:
-                    await update.effective_message.reply_text(
-                        f"⚠️ Unknown action: {data.split('_')[0] if '_' in data else data}\n\nPlease use the menu buttons",
-                        reply_markup=self.get_back_to_menu_keyboard()
-                    )
-                else:
-                    logger.warning("No effective message to reply to. Sending default message.")
-                    if update.effective_chat:
-                        await update.effective_chat.send_message(
-                            "⚠️ Action could not be completed. Please try again from the menu.",
-                            reply_markup=self.get_main_menu_keyboard()
-                        )
-                
+            await self.router.dispatch(query, query.data)
         except Exception as e:
             logger.error(f"Error in callback handler: {e}")
             if update.effective_chat:
@@ -350,10 +578,45 @@ class VetDictionaryBot:
                     reply_markup=self.get_main_menu_keyboard()
                 )
 
+    async def handle_unknown_callback(self, query, data: str):
+        """Single place for payloads that are unknown, malformed or from an older bot version"""
+        logger.warning(f"Unknown or stale button action received: {data}")
+        if query.message:
+            await query.message.reply_text(
+                "⚠️ This button is no longer valid.\n\nPlease use the menu buttons",
+                reply_markup=self.get_main_menu_keyboard()
+            )
+
+    async def show_main_menu_callback(self, query):
+        await query.edit_message_text(
+            "Select an option:",
+            reply_markup=self.get_main_menu_keyboard()
+        )
+
+    async def show_collection_menu_callback(self, query, action: str):
+        if action not in COLLECTION_ACTIONS:
+            raise StaleCallbackError(action)
+        await query.edit_message_text(
+            COLLECTION_ACTIONS[action],
+            reply_markup=self.get_collection_menu_keyboard(action)
+        )
+
+    async def show_collection_data_callback(self, query, direction: str, collection: str, cursor: str):
+        if direction not in ('n', 'p') or collection not in self.collections:
+            raise StaleCallbackError(collection)
+        await self.show_collection_data(query, collection, cursor, direction)
+
     async def show_collections_info_callback(self, query):
+        # Same full-collection counts as the statistics, so they share the 'stats' limit
+        wait = self.rate_limiter.check('stats', query.from_user.id)
+        if wait:
+            await query.edit_message_text(self.rate_limited_text(wait), reply_markup=self.get_back_to_menu_keyboard())
+            return
+        
         collections_text = "📋 Available Collections:\n\n"
+        counts = await self.get_collection_counts()
         for key, info in self.collections.items():
-            count = self.get_collection_count(key)
+            count = counts.get(key, 0)
             collections_text += f"{info['emoji']} {info['name']} ({count} items)\n"
             collections_text += f"   {info['description']}\n"
             collections_text += f"   Fields: {', '.join(info['fields'])}\n\n"
@@ -363,10 +626,9 @@ class VetDictionaryBot:
             reply_markup=self.get_back_to_menu_keyboard()
         )
 
-    async def handle_collection_action(self, query, data: str):
-        parts = data.split("_", 1)
-        action = parts[0]
-        collection = parts[1]
+    async def handle_collection_action(self, query, action: str, collection: str):
+        if action not in COLLECTION_ACTIONS or collection not in self.collections:
+            raise StaleCallbackError(f"{action} {collection}")
         user_id = query.from_user.id
         session = self.get_session(user_id)
         
@@ -419,12 +681,26 @@ class VetDictionaryBot:
                     f"🔍 Search in {collection_info['name']}\n\n"
                     f"Please send me the search term:"
                 )
+                
+            elif action == "import":
+                session['action'] = 'import'
+                session['collection'] = collection
+                session['waiting_for'] = 'file'
+                
+                collection_info = self.collections[collection]
+                await query.edit_message_text(
+                    f"📥 Bulk import into {collection_info['name']}\n\n"
+                    f"Send me a CSV, JSON (array of objects), NDJSON or XLSX file (max 20 MB).\n"
+                    f"Columns: {', '.join(collection_info['fields'])}"
+                )
         except Exception as e:
             logger.error(f"Error in collection action: {e}")
             await query.message.reply_text(
                 "An error occurred. Please use /start to restart.",
                 reply_markup=self.get_main_menu_keyboard()
             )
+        finally:
+            self.save_session(user_id)
 
     async def handle_text_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id = update.effective_user.id
@@ -447,14 +723,18 @@ class VetDictionaryBot:
                 await self.handle_delete_input(update, text, session)
             elif session['action'] == 'search':
                 await self.handle_search_input(update, text, session)
+            elif session['action'] == 'import':
+                await update.message.reply_text("📎 Please send the data as a file (CSV, JSON, NDJSON or XLSX).")
         except Exception as e:
             logger.error(f"Error handling text message: {e}")
             await update.message.reply_text(
                 "An error occurred. Please use /start to restart.",
                 reply_markup=self.get_main_menu_keyboard()
             )
+        finally:
+            self.save_session(user_id)
 
-    async def handle_add_input(self, update: Update, text: str, session: Dict[str, Any]):
+    async def handle_add_input(self, update: Update, text: str, session: Session):
         collection = session['collection']
         collection_info = self.collections[collection]
         fields = collection_info['fields']
@@ -463,7 +743,10 @@ class VetDictionaryBot:
         field_name = fields[current_field_index]
         session['data'][field_name] = text
         
-        if current_field_index + 1 < len(fields):
+        if session.get('waiting_for') == 'correction':
+            # Re-entering a field that failed validation; the rest were already given
+            await self.save_new_item(update, session)
+        elif current_field_index + 1 < len(fields):
             session['current_field'] += 1
             next_field = fields[current_field_index + 1]
             remaining = len(fields) - current_field_index - 1
@@ -476,51 +759,51 @@ class VetDictionaryBot:
         else:
             await self.save_new_item(update, session)
 
-    async def save_new_item(self, update: Update, session: Dict[str, Any]):
+    async def save_new_item(self, update: Update, session: Session):
         collection = session['collection']
         data = session['data']
         collection_info = self.collections[collection]
         
-        if not self.db:
+        if not self.store:
             await update.message.reply_text(
-                "❌ Firebase not initialized. Cannot save data.",
+                "❌ Database not initialized. Cannot save data.",
                 reply_markup=self.get_main_menu_keyboard()
             )
             return
             
         try:
-            # Validate required fields based on collection type
-            validation_error = self.validate_item_data(collection, data)
-            if validation_error:
+            # Validate and coerce fields against the collection's schema
+            errors = self.schemas[collection].apply(data)
+            if errors:
+                # Ask again for the first failing field (errors are in field order); the session keeps the rest
+                failed_field = next(field for field in collection_info['fields'] if field in errors)
+                session['current_field'] = collection_info['fields'].index(failed_field)
+                session['waiting_for'] = 'correction'
                 await update.message.reply_text(
-                    f"❌ Validation error: {validation_error}",
-                    reply_markup=self.get_main_menu_keyboard()
+                    f"❌ Validation error: {format_errors(errors)}\n\n"
+                    f"Please send the {failed_field} again:"
                 )
                 return
             
-            # Generate timestamp-based numeric ID for the id field (matching your existing structure)
-            import time
-            numeric_id = int(time.time() * 1000)  # Current timestamp in milliseconds
+            if session.get('action') == 'edit':
+                await self.save_edited_item(update, session)
+                return
+            
+            # Numeric ID for the id field (matching your existing structure), unique across instances
+            numeric_id = self.id_generator.next_id()
             data['id'] = numeric_id
             data['createdAt'] = datetime.now().isoformat()
             
-            # Add collection-specific fields if needed
-            if collection == 'drugs':
-                data['class'] = data.get('class', 'General')  # Default class for drugs
-            elif collection == 'normalRanges':
-                # Ensure numeric values for ranges
-                data['minValue'] = float(data.get('minValue', 0))
-                data['maxValue'] = float(data.get('maxValue', 0))
-            
             # Let Firebase auto-generate the document ID (matching your existing pattern)
-            doc_ref = self.db.collection(collection).add(data)
-            generated_doc_id = doc_ref[1].id  # Get the auto-generated document ID
-            logger.info(f"Saved new {collection} item to Firebase with document ID {generated_doc_id} and numeric ID {numeric_id}")
+            generated_doc_id = await self.store.add(collection, data)
+            logger.info(f"Saved new {collection} item with document ID {generated_doc_id} and numeric ID {numeric_id}")
+            if self.search_index:
+                self.search_index.add(collection, generated_doc_id, data)
             
             data_display = "\n".join([f"• {key}: {value}" for key, value in data.items() if key not in ['id', 'createdAt']])
             
             await update.message.reply_text(
-                f"✅ {collection_info['name']} added to Firebase!\n\n"
+                f"✅ {collection_info['name']} added!\n\n"
                 f"Document ID: {generated_doc_id}\n"
                 f"Numeric ID: {numeric_id}\n"
                 f"{data_display}",
@@ -536,57 +819,123 @@ class VetDictionaryBot:
                 reply_markup=self.get_main_menu_keyboard()
             )
 
-    def validate_item_data(self, collection: str, data: dict) -> str:
-        """Validate item data based on collection requirements"""
-        required_fields = {
-            'words': ['name', 'kurdish', 'arabic'],
-            'drugs': ['name', 'usage'],
-            'books': ['title', 'description'],
-            'diseases': ['name', 'symptoms'],
-            'staff': ['name', 'job'],
-            'tutorialVideos': ['Title', 'VideoID'],
-            'notifications': ['title', 'body'],
-            'users': ['username'],
-            'normalRanges': ['name', 'unit', 'minValue', 'maxValue'],
-            'appLinks': ['url']
-        }
+    async def handle_document(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        user_id = update.effective_user.id
+        session = self.get_session(user_id)
         
-        if collection in required_fields:
-            for field in required_fields[collection]:
-                if not data.get(field, '').strip():
-                    return f"Field '{field}' is required and cannot be empty"
+        if session.get('action') != 'import':
+            await update.message.reply_text(
+                "To import a file, choose 📥 Bulk Import from the menu first.",
+                reply_markup=self.get_main_menu_keyboard()
+            )
+            return
         
-        # Special validations
-        if collection == 'normalRanges':
-            try:
-                min_val = float(data.get('minValue', 0))
-                max_val = float(data.get('maxValue', 0))
-                if min_val >= max_val:
-                    return "minValue must be less than maxValue"
-            except ValueError:
-                return "minValue and maxValue must be valid numbers"
+        if not self.store:
+            await update.message.reply_text(
+                "❌ Database not initialized. Cannot import data.",
+                reply_markup=self.get_main_menu_keyboard()
+            )
+            return
+        
+        collection = session['collection']
+        self.clear_session(user_id)
+        await self.import_document(update, collection)
+
+    async def import_document(self, update: Update, collection: str):
+        """Stream rows from an uploaded file into Firestore in batches, reporting progress as it goes"""
+        collection_info = self.collections[collection]
+        fields = collection_info['fields']
+        schema = self.schemas[collection]
+        document = update.message.document
+        file_name = document.file_name or 'file'
+        report = ImportReport(collection_info['name'])
+        progress = await update.message.reply_text(f"📥 Receiving {file_name}...")
+        
+        fd, path = tempfile.mkstemp(prefix='import_')
+        os.close(fd)
+        try:
+            telegram_file = await document.get_file()
+            await telegram_file.download_to_drive(path)
+            rows = iter_rows(path, document.file_name, document.mime_type)
+            while True:
+                # Parsing is blocking file I/O, so pull each chunk of rows on the thread pool
+                chunk = await self.store.run(lambda: list(itertools.islice(rows, BATCH_SIZE)))
+                if not chunk:
+                    break
+                
+                items = []
+                for raw in chunk:
+                    report.rows += 1
+                    try:
+                        data = normalize_row(raw, fields)
+                    except ValueError as e:
+                        report.add_error(report.rows, str(e))
+                        continue
+                    errors = schema.apply(data)
+                    if errors:
+                        report.add_error(report.rows, format_errors(errors))
+                        continue
+                    data['createdAt'] = datetime.now().isoformat()
+                    items.append(data)
+                
+                if items:
+                    for data, item_id in zip(items, self.id_generator.next_ids(len(items))):
+                        data['id'] = item_id
+                    doc_ids = await self.store.add_many(collection, items)
+                    report.added += len(items)
+                    if self.search_index:
+                        for doc_id, data in zip(doc_ids, items):
+                            self.search_index.add(collection, doc_id, data)
+                
+                await progress.edit_text(report.progress_text())
+            
+            logger.info(f"Imported {report.added} {collection} items from {file_name} ({len(report.errors)} errors)")
+        except Exception as e:
+            logger.error(f"Bulk import into {collection} failed: {e}", exc_info=True)
+            report.aborted = str(e)
+        finally:
+            os.remove(path)
         
-        return None  # No validation errors
+        await progress.edit_text(
+            report.summary_text(collection_info['name']),
+            reply_markup=self.get_main_menu_keyboard()
+        )
 
-    async def handle_edit_input(self, update: Update, text: str, session: Dict[str, Any]):
+    async def save_edited_item(self, update: Update, session: Session):
+        collection = session['collection']
+        item_id = session['item_id']
+        data = session['data']
+        collection_info = self.collections[collection]
+        
+        data['updatedAt'] = datetime.now().isoformat()
+        if await self.store.update(collection, item_id, data):
+            logger.info(f"Updated {collection} item with document ID {session['doc_id']} and numeric ID {item_id}")
+            if self.search_index:
+                self.search_index.add(collection, session['doc_id'], dict(data, id=item_id))
+            
+            data_display = "\n".join([f"• {key}: {value}" for key, value in data.items() if key not in ['id', 'createdAt', 'updatedAt']])
+            text = (
+                f"✅ {collection_info['name']} (ID: {item_id}) updated!\n\n"
+                f"{data_display}"
+            )
+        else:
+            text = f"❌ Item with ID {item_id} no longer exists."
+        
+        await update.message.reply_text(text, reply_markup=self.get_main_menu_keyboard())
+        self.clear_session(update.effective_user.id)
+
+    async def handle_edit_input(self, update: Update, text: str, session: Session):
         if session.get('waiting_for') == 'id':
             try:
                 item_id = int(text)
                 collection = session['collection']
                 
-                # Search for document by the numeric ID field (not document ID)
-                docs = self.db.collection(collection).where('id', '==', item_id).stream()
-                doc_found = None
-                doc_id = None
-                
-                for doc in docs:
-                    doc_found = doc
-                    doc_id = doc.id
-                    break
+                # Resolve the numeric ID field (not document ID) from the local id map
+                doc_found = await self.store.get_by_id(collection, item_id)
                 
                 if doc_found:
                     session['item_id'] = item_id
-                    session['doc_id'] = doc_id  # Store the Firebase document ID
+                    session['doc_id'] = doc_found.id  # Store the Firebase document ID
                     session['waiting_for'] = 'field_data'
                     session['current_field'] = 0
                     session['data'] = {}
@@ -612,23 +961,19 @@ class VetDictionaryBot:
         else:
             await self.handle_add_input(update, text, session)
 
-    async def handle_delete_input(self, update: Update, text: str, session: Dict[str, Any]):
+    async def handle_delete_input(self, update: Update, text: str, session: Session):
         if session.get('waiting_for') == 'id':
             try:
                 item_id = int(text)
                 collection = session['collection']
                 collection_info = self.collections[collection]
                 
-                # Search for document by the numeric ID field (not document ID)
-                docs = self.db.collection(collection).where('id', '==', item_id).stream()
-                doc_found = None
-                
-                for doc in docs:
-                    doc_found = doc
-                    break
+                # Resolve the numeric ID field (not document ID) from the local id map
+                deleted_doc_id = await self.store.delete(collection, item_id)
                 
-                if doc_found:
-                    doc_found.reference.delete()
+                if deleted_doc_id:
+                    if self.search_index:
+                        self.search_index.remove(collection, deleted_doc_id)
                     await update.message.reply_text(
                         f"✅ {collection_info['name']} with ID {item_id} deleted successfully!",
                         reply_markup=self.get_main_menu_keyboard()
@@ -644,8 +989,14 @@ class VetDictionaryBot:
             except ValueError:
                 await update.message.reply_text("❌ Please provide a valid numeric ID.")
 
-    async def handle_search_input(self, update: Update, text: str, session: Dict[str, Any]):
+    async def handle_search_input(self, update: Update, text: str, session: Session):
         if session.get('waiting_for') == 'search_query':
+            wait = self.rate_limiter.check('search', update.effective_user.id)
+            if wait:
+                # Keep the session so the admin can send the term again once the limit allows
+                await update.message.reply_text(self.rate_limited_text(wait))
+                return
+            
             try:
                 search_term = text.strip()
                 collection = session['collection']
@@ -683,16 +1034,24 @@ class VetDictionaryBot:
                 )
                 self.clear_session(update.effective_user.id)
 
-    async def show_collection_data(self, query, collection: str):
+    async def show_collection_data(self, query, collection: str, cursor: str = None, direction: str = 'n'):
+        """Show one page of a collection; `cursor` is the document ID the page starts after ('n') or ends before ('p')"""
         collection_info = self.collections[collection]
+        # Only the field shown in the list and the numeric ID are downloaded
+        fields = [collection_info['display_field'], 'id']
         
         try:
-            docs = self.db.collection(collection).stream()
-            items = [doc.to_dict() for doc in docs]
+            if direction == 'p':
+                docs, has_prev = await self.store.page(collection, VIEW_PAGE_SIZE, end_before=cursor, fields=fields)
+                has_next = True
+            else:
+                docs, has_next = await self.store.page(collection, VIEW_PAGE_SIZE, start_after=cursor, fields=fields)
+                has_prev = cursor is not None
             
-            if items:
+            if docs:
                 preview = []
-                for item in items[:5]:
+                for doc in docs:
+                    item = doc.to_dict()
                     display_name = (
                         item.get('title') or 
                         item.get('name') or 
@@ -704,15 +1063,23 @@ class VetDictionaryBot:
                     )
                     preview.append(f"• {display_name} (ID: {item.get('id', 'N/A')})")
                 
-                text = f"📋 {collection_info['name']} ({len(items)} total):\n\n" + "\n".join(preview)
-                if len(items) > 5:
-                    text += f"\n\n... and {len(items) - 5} more items"
+                total = await self.get_collection_count(collection)
+                text = f"📋 {collection_info['name']} ({total} total):\n\n" + "\n".join(preview)
+                reply_markup = self.get_pagination_keyboard(
+                    collection,
+                    docs[0].id if has_prev else None,
+                    docs[-1].id if has_next else None
+                )
+            elif cursor is not None:
+                text = f"No more {collection_info['name'].lower()} to show."
+                reply_markup = self.get_pagination_keyboard(collection, None, None)
             else:
                 text = f"No {collection_info['name'].lower()} found."
+                reply_markup = self.get_back_to_menu_keyboard()
             
             await query.edit_message_text(
                 text,
-                reply_markup=self.get_back_to_menu_keyboard()
+                reply_markup=reply_markup
             )
             
         except Exception as e:
@@ -722,20 +1089,44 @@ class VetDictionaryBot:
                 reply_markup=self.get_back_to_menu_keyboard()
             )
 
+    def get_pagination_keyboard(self, collection: str, prev_cursor: str = None, next_cursor: str = None) -> InlineKeyboardMarkup:
+        nav = []
+        for label, direction, cursor in (("« Prev", "p", prev_cursor), ("Next »", "n", next_cursor)):
+            if not cursor:
+                continue
+            try:
+                nav.append(InlineKeyboardButton(label, callback_data=encode_callback("pg", direction, collection, cursor)))
+            except ValueError:
+                logger.warning(f"Cursor {cursor} too long for callback_data; hiding {label} button")
+        
+        keyboard = [nav] if nav else []
+        keyboard.append([InlineKeyboardButton("« Back to Menu", callback_data=encode_callback("home"))])
+        return InlineKeyboardMarkup(keyboard)
+
     async def show_statistics(self, update: Update):
-        await self._show_stats(update.message.reply_text)
+        await self._show_stats(update.effective_user.id, update.message.reply_text)
 
     async def show_statistics_callback(self, query):
-        await self._show_stats(lambda text, **kwargs: query.edit_message_text(text, **kwargs))
+        await self._show_stats(query.from_user.id, lambda text, **kwargs: query.edit_message_text(text, **kwargs))
 
-    async def _show_stats(self, reply_func):
+    async def _show_stats(self, user_id: int, reply_func):
+        wait = self.rate_limiter.check('stats', user_id)
+        if wait:
+            await reply_func(self.rate_limited_text(wait), reply_markup=self.get_back_to_menu_keyboard())
+            return
+        
         try:
             stats_text = "📊 Veterinary Dictionary Statistics:\n\n"
             total = 0
+            counts = await self.get_collection_counts()
             
             for collection_key, collection_info in self.collections.items():
-                count = self.get_collection_count(collection_key)
-                stats_text += f"{collection_info['emoji']} {collection_info['name']}: {count}\n"
+                count = counts.get(collection_key, 0)
+                stats_text += f"{collection_info['emoji']} {collection_info['name']}: {count}"
+                last_modified = self.stats_service.last_modified.get(collection_key)
+                if last_modified:
+                    stats_text += f" (updated {last_modified.strftime('%Y-%m-%d %H:%M')})"
+                stats_text += "\n"
                 total += count
             
             stats_text += f"\nTotal Records: {total}"
@@ -753,46 +1144,66 @@ class VetDictionaryBot:
                 reply_markup=self.get_back_to_menu_keyboard()
             )
 
-    def get_collection_count(self, collection_key: str) -> int:
+    async def get_collection_count(self, collection_key: str) -> int:
+        if collection_key in self.stats_service.counts:
+            return self.stats_service.counts[collection_key]
+        if not self.store:
+            return 0
         try:
-            docs = self.db.collection(collection_key).stream()
-            return len([doc for doc in docs])
+            return await self.single_flight.do(
+                ('count', collection_key), lambda: self._expensive_read(self.store.count(collection_key)), 'count'
+            )
         except Exception as e:
             logger.error(f"Error getting collection count: {e}")
             return 0
 
+    async def get_collection_counts(self) -> Dict[str, int]:
+        """Count every configured collection, from live listener state when available (no reads)
+        or in one pass of at most one read per collection"""
+        if self.stats_service.is_ready():
+            return dict(self.stats_service.counts)
+        if not self.store:
+            return {}
+        try:
+            # Ten admins tapping Statistics at once share one pass over the collections
+            return await self.single_flight.do(
+                'count_all', lambda: self._expensive_read(self.store.count_all(self.collections)), 'count_all'
+            )
+        except Exception as e:
+            logger.error(f"Error getting collection counts: {e}")
+            return {}
+
     async def search_in_collection(self, collection: str, search_term: str) -> list:
-        """Search for items in a collection based on the search term"""
-        if not self.db:
+        """Search for items in a collection, most relevant first"""
+        if not self.store:
             return []
         
+        if self.search_index:
+            indexed = self.search_index.search(collection, search_term)
+            if indexed is not None:
+                return indexed
+        
         try:
-            # Get all documents from the collection
-            docs = self.db.collection(collection).stream()
-            results = []
-            
-            search_lower = search_term.lower()
-            
-            for doc in docs:
-                data = doc.to_dict()
-                # Search in all text fields
-                found = False
-                
-                for field_name in self.collections[collection]['fields']:
-                    field_value = data.get(field_name, '')
-                    if isinstance(field_value, str) and search_lower in field_value.lower():
-                        found = True
-                        break
-                
-                if found:
-                    results.append(data)
-            
-            return results
-            
+            # No index ready: let the backend search (Firestore scan or SQLite FTS5), then rank like the index
+            fields = self.collections[collection]['fields']
+            results = await self.single_flight.do(
+                ('search', collection, search_term),
+                lambda: self._expensive_read(self.store.search(collection, search_term, fields)),
+                'search'
+            )
+            return rank_results(results, search_term, fields)
         except Exception as e:
             logger.error(f"Error searching collection {collection}: {e}")
             return []
 
+    async def _expensive_read(self, read):
+        """Await a read that may scan whole collections, at most MAX_EXPENSIVE_READS at a time"""
+        async with self.expensive_reads:
+            return await read
+
+    def rate_limited_text(self, wait: float) -> str:
+        return f"⏳ Too many requests. Please try again in {math.ceil(wait)}s."
+
     def get_item_display_name(self, item: dict, collection: str) -> str:
         """Get a display name for an item based on its collection type"""
         if collection == 'words':
@@ -821,22 +1232,165 @@ class VetDictionaryBot:
         else:
             return f"Item {item.get('id', 'N/A')}"
 
+    async def handle_inline_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Answer `@bot term` from the in-memory index; never reads Firestore"""
+        inline_query = update.inline_query
+        term = inline_query.query.strip()
+        try:
+            if not term or not self.inline_search or not self.inline_search.is_ready():
+                # Don't let clients cache an empty answer given while the index is still loading
+                await inline_query.answer([], cache_time=0 if term else INLINE_CACHE_TIME)
+                return
+            
+            offset = int(inline_query.offset or 0)
+            # Later pages and cached queries are answered at once; new keystrokes wait for the user to pause
+            if not offset and self.inline_search.cached(term) is None:
+                if not await self.inline_debouncer.wait(inline_query.from_user.id, inline_query.id):
+                    return
+            
+            matches = self.inline_search.lookup(term)
+            page = matches[offset:offset + PAGE_SIZE]
+            next_offset = str(offset + PAGE_SIZE) if offset + PAGE_SIZE < len(matches) else ''
+            await inline_query.answer(
+                [
+                    self.build_inline_result(str(offset + position), collection, item)
+                    for position, (collection, item) in enumerate(page)
+                ],
+                cache_time=INLINE_CACHE_TIME,
+                is_personal=False,
+                next_offset=next_offset
+            )
+        except Exception as e:
+            logger.error(f"Error answering inline query '{term}': {e}")
+
+    def build_inline_result(self, result_id: str, collection: str, item: dict) -> InlineQueryResultArticle:
+        """One inline result: the entry's name as the title, its other fields in the message sent"""
+        collection_info = self.collections[collection]
+        display_field = collection_info['display_field']
+        title = f"{collection_info['emoji']} {self.get_item_display_name(item, collection)}"
+        details = [
+            (field, str(item[field]).strip()) for field in collection_info['fields']
+            if field != display_field and item.get(field) not in (None, '')
+        ]
+        description = ' · '.join(value for _, value in details)
+        if len(description) > INLINE_DESCRIPTION_LENGTH:
+            description = description[:INLINE_DESCRIPTION_LENGTH - 3] + "..."
+        message = title + "\n\n" + "\n".join(f"{field}: {value}" for field, value in details)
+        return InlineQueryResultArticle(
+            # Unique within the answer even if two entries share an `id`
+            id=f"{result_id}:{collection}:{item.get('id', 'N/A')}"[:64],
+            title=title,
+            description=description or collection_info['name'],
+            input_message_content=InputTextMessageContent(message.strip()[:INLINE_MESSAGE_LENGTH])
+        )
+
+    def build_application(self) -> Application:
+        application = (
+            Application.builder()
+            .token(self.bot_token)
+            .concurrent_updates(self.update_processor)
+            # Every Bot API call goes through per-chat and global flood budgets, with RetryAfter retried
+            .rate_limiter(SendScheduler())
+            .post_init(self._post_init)
+            .post_shutdown(self._post_shutdown)
+            .build()
+        )
+        
+        # Every handler is wrapped to record its latency and errors for the metrics endpoint
+        application.add_handler(CommandHandler("start", track_handler(self.start_command)))
+        application.add_handler(CommandHandler("help", track_handler(self.help_command)))
+        application.add_handler(CommandHandler("menu", track_handler(self.menu_command)))
+        application.add_handler(CommandHandler("stats", track_handler(self.stats_command)))
+        application.add_handler(CommandHandler("collections", track_handler(self.collections_command)))
+        application.add_handler(CommandHandler("export", track_handler(self.export_command)))
+        application.add_handler(CallbackQueryHandler(track_handler(self.handle_callback_query)))
+        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, track_handler(self.handle_text_message)))
+        application.add_handler(MessageHandler(filters.Document.ALL, track_handler(self.handle_document)))
+        # Non-blocking so a debounced query waiting out its delay doesn't hold up other updates
+        application.add_handler(InlineQueryHandler(track_handler(self.handle_inline_query), block=False))
+        return application
+
+    async def _post_init(self, application: Application):
+        # Listener threads hand statistics updates to the event loop from here on
+        self.stats_service.bind(asyncio.get_running_loop())
+        if self.leader:
+            # Renewal runs on a background thread; stopping must happen on the event loop
+            loop = asyncio.get_running_loop()
+            self.leader.start_renewing(on_lost=lambda: loop.call_soon_threadsafe(self._stop_serving, application))
+        
+        port = int(os.getenv('METRICS_PORT', '9464'))
+        if port:
+            server = MetricsServer(listen=os.getenv('METRICS_LISTEN', '127.0.0.1'), port=port)
+            try:
+                await server.start()
+                self.metrics_server = server
+            except OSError as e:
+                logger.error(f"Failed to start metrics server on port {port}: {e}")
+
+    def _stop_serving(self, application: Application):
+        # stop_running() stops the loop run_polling owns; the webhook server runs inside asyncio.run, which
+        # must be left to finish serve() so the shutdown hooks still run
+        if self.webhook_server:
+            self.webhook_server.stop()
+        else:
+            application.stop_running()
+
+    async def _post_shutdown(self, application: Application):
+        if self.metrics_server:
+            await self.metrics_server.stop()
+            self.metrics_server = None
+
     def run(self):
-        application = Application.builder().token(self.bot_token).build()
+        application = self.build_application()
+        mode = os.getenv('BOT_MODE', 'polling').lower()
         
-        application.add_handler(CommandHandler("start", self.start_command))
-        application.add_handler(CommandHandler("help", self.help_command))
-        application.add_handler(CommandHandler("menu", self.menu_command))
-        application.add_handler(CommandHandler("stats", self.stats_command))
-        application.add_handler(CommandHandler("collections", self.collections_command))
-        application.add_handler(CallbackQueryHandler(self.handle_callback_query))
-        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_text_message))
+        if self.db:
+            if os.getenv('SEARCH_INDEX_LISTENERS', 'true').lower() != 'false':
+                self.watcher.subscribe(self.search_index.on_snapshot)
+                self.watcher.subscribe(self.stats_service.on_snapshot)
+                self.watcher.start()
+            else:
+                self.search_index.build_all()
         
-        logger.info("Starting Veterinary Dictionary Telegram Bot...")
+        logger.info(f"Starting Veterinary Dictionary Telegram Bot ({mode} mode)...")
         print("Bot is running! Go to Telegram and send /start to your bot.")
         print("Bot username: @VETDICT_ADMIN_BOT")
-        # Use drop_pending_updates to ensure previous polling sessions are terminated and avoid 409 Conflict errors
-        application.run_polling(allowed_updates=Update.ALL_TYPES, drop_pending_updates=True)
+        try:
+            # Only the leader serves, in either mode; a webhook standby would otherwise process updates too
+            if self.leader:
+                self.leader.wait_for_leadership()
+            if mode == 'webhook':
+                self.run_webhook(application)
+            else:
+                # Without leader election, drop_pending_updates ensures previous polling sessions are terminated
+                # and avoids 409 Conflict errors; an elected leader keeps the queue so no admin action is lost
+                application.run_polling(allowed_updates=Update.ALL_TYPES, drop_pending_updates=self.leader is None)
+        finally:
+            if self.leader:
+                self.leader.release()
+            if self.watcher:
+                self.watcher.stop()
+            if self.store:
+                self.store.shutdown()
+            self.sessions.close()
+            self.instance_lock.release()
+
+    def run_webhook(self, application: Application):
+        """Serve updates over HTTP; configured through the WEBHOOK_* environment variables"""
+        from webhook import WebhookServer
+        
+        server = self.webhook_server = WebhookServer(
+            application,
+            listen=os.getenv('WEBHOOK_LISTEN', '0.0.0.0'),
+            port=int(os.getenv('WEBHOOK_PORT', '8443')),
+            path=os.getenv('WEBHOOK_PATH', '/telegram'),
+            secret_token=os.getenv('WEBHOOK_SECRET'),
+            webhook_url=os.getenv('WEBHOOK_URL')
+        )
+        try:
+            asyncio.run(server.serve())
+        except KeyboardInterrupt:
+            logger.info("Webhook server stopped")
 
 def main():
     try:
@@ -0,0 +1,171 @@
+"""
+Bulk import parsing for the Veterinary Dictionary Bot
+Streams rows out of CSV, JSON, NDJSON and XLSX files without loading the whole file
+"""
+
+import csv
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Firestore allows at most 500 writes per batch
+BATCH_SIZE = 500
+READ_CHUNK_SIZE = 64 * 1024
+# Errors listed individually in the final report
+MAX_REPORTED_ERRORS = 20
+
+SUPPORTED_EXTENSIONS = ('.csv', '.json', '.jsonl', '.ndjson', '.xlsx')
+# Characters that can continue a JSON number
+NUMBER_CHARS = frozenset('0123456789+-.eE')
+# Used when an upload has no file name
+MIME_EXTENSIONS = {
+    'text/csv': '.csv',
+    'application/json': '.json',
+    'application/x-ndjson': '.ndjson',
+    'application/jsonl': '.jsonl',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': '.xlsx',
+}
+
+
+class InvalidRow:
+    """Stands in for a record that could not be parsed, so the rows around it are still imported"""
+
+    __slots__ = ('message',)
+
+    def __init__(self, message: str):
+        self.message = message
+
+
+def _iter_csv(path: str) -> Iterator[Any]:
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        yield from csv.DictReader(f)
+
+
+def _iter_ndjson(path: str) -> Iterator[Any]:
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                yield InvalidRow(f"invalid JSON ({e.msg} at column {e.colno})")
+
+
+def _iter_json_array(path: str) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array one at a time, reading the file in chunks"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    eof = False
+
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        while True:
+            buffer = buffer.lstrip(' \t\r\n,' if started else ' \t\r\n')
+            if buffer and not started:
+                if buffer[0] != '[':
+                    raise ValueError("JSON file must contain an array of objects")
+                buffer = buffer[1:]
+                started = True
+                continue
+            if buffer.startswith(']'):
+                return
+            if buffer:
+                try:
+                    item, end = decoder.raw_decode(buffer)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    # A number is only complete once something other than a digit, sign, '.' or exponent follows
+                    # it; the chunk boundary may have cut it after any of its characters
+                    number = isinstance(item, (int, float)) and not isinstance(item, bool)
+                    if eof or not number or (end < len(buffer) and buffer[end] not in NUMBER_CHARS):
+                        yield item
+                        buffer = buffer[end:]
+                        continue
+            if eof:
+                raise ValueError("Unexpected end of JSON file")
+            chunk = f.read(READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer += chunk
+
+
+def _iter_xlsx(path: str) -> Iterator[Any]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("XLSX import requires the openpyxl package")
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name).strip() if name is not None else '' for name in header]
+        for values in rows:
+            if values and any(value is not None for value in values):
+                yield dict(zip(columns, values))
+    finally:
+        workbook.close()
+
+
+def iter_rows(path: str, file_name: Optional[str], mime_type: Optional[str] = None) -> Iterator[Any]:
+    """Iterate the raw records of an uploaded file, picking the parser from its extension (or MIME type)"""
+    extension = os.path.splitext(file_name.lower())[1] if file_name else ''
+    if not extension and mime_type:
+        extension = MIME_EXTENSIONS.get(mime_type.split(';')[0].strip().lower(), '')
+    if extension == '.csv':
+        return _iter_csv(path)
+    if extension in ('.jsonl', '.ndjson'):
+        return _iter_ndjson(path)
+    if extension == '.json':
+        return _iter_json_array(path)
+    if extension == '.xlsx':
+        return _iter_xlsx(path)
+    raise ValueError(f"Unsupported file type '{extension or file_name or mime_type or 'unknown'}'. Use one of: {', '.join(SUPPORTED_EXTENSIONS)}")
+
+
+def normalize_row(row: Any, fields: List[str]) -> Dict[str, str]:
+    """Map a raw record onto a collection's fields as stripped strings; unknown columns are ignored"""
+    if isinstance(row, InvalidRow):
+        raise ValueError(row.message)
+    if not isinstance(row, dict):
+        raise ValueError("expected an object with field names")
+    data = {}
+    for field in fields:
+        value = row.get(field)
+        data[field] = '' if value is None else str(value).strip()
+    return data
+
+
+class ImportReport:
+    def __init__(self, collection: str):
+        self.collection = collection
+        self.rows = 0
+        self.added = 0
+        self.errors: List[Tuple[int, str]] = []
+        self.aborted: Optional[str] = None
+
+    def add_error(self, row_number: int, message: str):
+        self.errors.append((row_number, message))
+
+    def progress_text(self) -> str:
+        return f"⏳ Importing into {self.collection}...\n\nRows read: {self.rows}\nAdded: {self.added}\nErrors: {len(self.errors)}"
+
+    def summary_text(self, collection_name: str) -> str:
+        text = (
+            f"{'⚠️' if self.aborted or self.errors else '✅'} Import into {collection_name} finished\n\n"
+            f"Rows read: {self.rows}\n"
+            f"Added: {self.added}\n"
+            f"Errors: {len(self.errors)}"
+        )
+        if self.aborted:
+            text += f"\n\nImport stopped early: {self.aborted}"
+        if self.errors:
+            text += "\n\n" + "\n".join(f"• Row {row}: {message}" for row, message in self.errors[:MAX_REPORTED_ERRORS])
+            if len(self.errors) > MAX_REPORTED_ERRORS:
+                text += f"\n... and {len(self.errors) - MAX_REPORTED_ERRORS} more errors"
+        return text
@@ -0,0 +1,99 @@
+"""
+Read-through collection cache for the Veterinary Dictionary Bot
+Keeps per-collection document snapshots with a TTL and LRU eviction bounded by total documents.
+Projected reads (only some fields selected) are cached separately from full reads of the same collection.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 60
+DEFAULT_MAX_DOCUMENTS = 20000
+
+
+class CollectionCache:
+    def __init__(self, ttl: Optional[float] = None, max_documents: Optional[int] = None):
+        if ttl is None:
+            ttl = float(os.getenv('CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+        if max_documents is None:
+            max_documents = int(os.getenv('CACHE_MAX_DOCUMENTS', DEFAULT_MAX_DOCUMENTS))
+        self.ttl = ttl
+        self.max_documents = max_documents
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # (collection, projection) -> (expires_at, documents); order is least to most recently used
+        self._entries: "OrderedDict[Tuple[str, Optional[tuple]], Tuple[float, List[Any]]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(collection: str, projection: Optional[Sequence[str]]) -> Tuple[str, Optional[tuple]]:
+        return collection, tuple(projection) if projection is not None else None
+
+    def get(self, collection: str, projection: Optional[Sequence[str]] = None) -> Optional[List[Any]]:
+        key = self._key(collection, projection)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, documents = entry
+            if expires_at <= time.monotonic():
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return documents
+
+    def put(self, collection: str, documents: List[Any], projection: Optional[Sequence[str]] = None):
+        if self.ttl <= 0 or len(documents) > self.max_documents:
+            return  # caching disabled, or the collection alone would blow the budget
+        key = self._key(collection, projection)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, documents)
+            self._size += len(documents)
+            while self._size > self.max_documents:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+                logger.debug(f"Evicted {oldest} from collection cache")
+
+    def invalidate(self, collection: str):
+        """Drop every cached read (full or projected) of a collection"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == collection]:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _drop(self, key: Tuple[str, Optional[tuple]]):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'documents': self._size,
+            }
@@ -0,0 +1,102 @@
+"""
+Callback query routing for the Veterinary Dictionary Bot
+Compact, versioned callback_data encoding and an O(1) route table with per-route timing
+"""
+
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bump when the payload layout changes; buttons from older messages are then treated as stale
+CALLBACK_VERSION = '1'
+SEPARATOR = ':'
+# Telegram rejects callback_data longer than this many bytes
+CALLBACK_DATA_LIMIT = 64
+
+
+class StaleCallbackError(Exception):
+    """Raised by a route handler when its arguments no longer refer to anything valid"""
+
+
+def encode_callback(route: str, *args: Any) -> str:
+    """Build callback_data like '1:col:add:books'; raises ValueError if it exceeds Telegram's limit"""
+    parts = [CALLBACK_VERSION, route] + [str(arg) for arg in args]
+    if any(SEPARATOR in part for part in parts[1:-1] + [route]):
+        raise ValueError(f"Callback route and leading arguments must not contain '{SEPARATOR}'")
+    data = SEPARATOR.join(parts)
+    if len(data.encode()) > CALLBACK_DATA_LIMIT:
+        raise ValueError(f"callback_data is longer than {CALLBACK_DATA_LIMIT} bytes: {data}")
+    return data
+
+
+def decode_callback(data: str) -> Optional[Tuple[str, List[str]]]:
+    """Split callback_data into (route, args), or None if it is not a current-version payload"""
+    version, _, rest = (data or '').partition(SEPARATOR)
+    if version != CALLBACK_VERSION or not rest:
+        return None
+    route, _, arguments = rest.partition(SEPARATOR)
+    return route, arguments.split(SEPARATOR) if arguments else []
+
+
+class RouteStats:
+    __slots__ = ('calls', 'errors', 'total', 'max')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, elapsed: float, failed: bool):
+        self.calls += 1
+        self.errors += failed
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.calls if self.calls else 0.0
+
+
+class CallbackRouter:
+    def __init__(self, on_unknown: Callable[[Any, str], Awaitable[None]]):
+        # route -> (handler, number of arguments it takes); the last argument may contain ':'
+        self._routes: Dict[str, Tuple[Callable[..., Awaitable[None]], int]] = {}
+        self.on_unknown = on_unknown
+        self.stats: Dict[str, RouteStats] = {}
+
+    def register(self, route: str, handler: Callable[..., Awaitable[None]], arity: int = 0):
+        self._routes[route] = (handler, arity)
+        self.stats[route] = RouteStats()
+
+    async def dispatch(self, query, data: str):
+        decoded = decode_callback(data)
+        entry = self._routes.get(decoded[0]) if decoded else None
+        if entry is None:
+            await self.on_unknown(query, data)
+            return
+
+        route, args = decoded
+        handler, arity = entry
+        if arity and len(args) > arity:
+            # Only the final argument may contain the separator (e.g. a cursor)
+            args = args[:arity - 1] + [SEPARATOR.join(args[arity - 1:])]
+        if len(args) != arity:
+            await self.on_unknown(query, data)
+            return
+
+        started = time.perf_counter()
+        failed = False
+        try:
+            await handler(query, *args)
+        except StaleCallbackError:
+            await self.on_unknown(query, data)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stats[route].record(elapsed, failed)
+            logger.debug(f"Callback route {route} took {elapsed * 1000:.1f} ms")
@@ -0,0 +1,105 @@
+"""
+Collection counting for the Veterinary Dictionary Bot
+Uses Firestore aggregation count queries, falling back to a maintained counter document
+"""
+
+import logging
+import math
+from typing import Dict, Iterable, Optional, Set
+
+from firebase_admin import firestore
+
+from metrics import record_firestore
+
+logger = logging.getLogger(__name__)
+
+# Counter document holding one numeric field per collection
+COUNTERS_COLLECTION = '_meta'
+COUNTERS_DOCUMENT = 'counters'
+
+
+class CollectionCounter:
+    def __init__(self, db, collections: Iterable[str]):
+        self.db = db
+        self.collections = list(collections)
+        # None until the first aggregation attempt tells us whether the backend supports it
+        self.aggregation_supported: Optional[bool] = None
+        # Collections whose field in the counter document is known to exist
+        self._seeded: Optional[Set[str]] = None
+
+    def _counter_ref(self):
+        return self.db.collection(COUNTERS_COLLECTION).document(COUNTERS_DOCUMENT)
+
+    def _aggregate_count(self, collection: str) -> int:
+        """Run a server-side COUNT() aggregation; costs one read per 1000 index entries"""
+        results = self.db.collection(collection).count(alias='total').get()
+        total = int(results[0][0].value)
+        record_firestore(collection, 'count', reads=max(1, math.ceil(total / 1000)))
+        return total
+
+    def _scan_count(self, collection: str) -> int:
+        """Count documents by streaming their keys only (no fields are downloaded)"""
+        docs = self.db.collection(collection).select([]).stream()
+        total = sum(1 for _ in docs)
+        record_firestore(collection, 'count_scan', reads=max(1, total))
+        return total
+
+    def count(self, collection: str) -> int:
+        return self.count_all([collection])[collection]
+
+    def count_all(self, collections: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """Count several collections, preferring aggregation queries over the counter document"""
+        collections = list(collections) if collections is not None else self.collections
+        counts: Dict[str, int] = {}
+
+        if self.aggregation_supported is not False:
+            try:
+                for collection in collections:
+                    counts[collection] = self._aggregate_count(collection)
+                self.aggregation_supported = True
+                return counts
+            except AttributeError:
+                # Client library predates aggregation queries
+                logger.warning("Aggregation queries not available; using counter document for counts")
+                self.aggregation_supported = False
+            except Exception as e:
+                logger.warning(f"Aggregation count failed, using counter document: {e}")
+
+        return self._counts_from_document(collections)
+
+    def _counts_from_document(self, collections: Iterable[str]) -> Dict[str, int]:
+        snapshot = self._counter_ref().get()
+        record_firestore(COUNTERS_COLLECTION, 'counter_read', reads=1)
+        stored = (snapshot.to_dict() or {}) if snapshot.exists else {}
+        self._seeded = set(stored)
+
+        counts: Dict[str, int] = {}
+        missing: Dict[str, int] = {}
+        for collection in collections:
+            if collection in stored:
+                counts[collection] = int(stored[collection])
+            else:
+                # One-off full key scan to seed the counter for this collection
+                counts[collection] = missing[collection] = self._scan_count(collection)
+
+        if missing:
+            self._counter_ref().set(missing, merge=True)
+            record_firestore(COUNTERS_COLLECTION, 'counter_seed', writes=1)
+            self._seeded.update(missing)
+            logger.info(f"Seeded collection counters: {missing}")
+
+        return counts
+
+    def increment(self, collection: str, delta: int = 1):
+        """Adjust the maintained counter after a write; unseeded counters are left for the next seed scan"""
+        try:
+            if self._seeded is None:
+                snapshot = self._counter_ref().get()
+                record_firestore(COUNTERS_COLLECTION, 'counter_read', reads=1)
+                self._seeded = set(snapshot.to_dict() or {}) if snapshot.exists else set()
+            if collection not in self._seeded:
+                return
+            self._counter_ref().set({collection: firestore.Increment(delta)}, merge=True)
+            record_firestore(COUNTERS_COLLECTION, 'counter_increment', writes=1)
+        except Exception as e:
+            logger.error(f"Error updating counter for {collection}: {e}")
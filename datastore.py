@@ -0,0 +1,234 @@
+"""
+Firestore repository for the Veterinary Dictionary Bot
+Runs the blocking Firestore client on a bounded thread pool so handlers never block the event loop
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from google.api_core.exceptions import NotFound
+
+from cache import CollectionCache
+from counts import CollectionCounter
+from metrics import FIRESTORE_DURATION, record_firestore
+from repository import Repository, numeric_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+
+# Field path Firestore uses for ordering by document ID
+DOCUMENT_ID = '__name__'
+
+
+class IdMap:
+    """Per-collection map from the user-facing numeric `id` field to a DocumentReference"""
+
+    def __init__(self):
+        self._maps: Dict[str, Dict[int, Any]] = {}
+        self._lock = threading.Lock()
+
+    def is_loaded(self, collection: str) -> bool:
+        return collection in self._maps
+
+    def load(self, collection: str, pairs: Iterable[Tuple[int, Any]]):
+        mapping = {}
+        for item_id, reference in pairs:
+            mapping.setdefault(item_id, reference)  # keep the first on duplicate ids
+        with self._lock:
+            self._maps[collection] = mapping
+
+    def get(self, collection: str, item_id: int) -> Optional[Any]:
+        return self._maps.get(collection, {}).get(item_id)
+
+    def set(self, collection: str, item_id: int, reference):
+        with self._lock:
+            if collection in self._maps:
+                self._maps[collection][item_id] = reference
+
+    def discard(self, collection: str, item_id: int):
+        with self._lock:
+            self._maps.get(collection, {}).pop(item_id, None)
+
+    def invalidate(self, collection: str):
+        with self._lock:
+            self._maps.pop(collection, None)
+
+
+class FirestoreStore(Repository):
+    def __init__(self, db, max_workers: Optional[int] = None, cache: Optional[CollectionCache] = None):
+        if max_workers is None:
+            max_workers = int(os.getenv('FIRESTORE_MAX_WORKERS', DEFAULT_MAX_WORKERS))
+        super().__init__(max_workers, 'firestore')
+        self.db = db
+        self.cache = cache if cache is not None else CollectionCache()
+        self.ids = IdMap()
+        # Server-side counting (aggregation queries or maintained counter document)
+        self.counter = CollectionCounter(db, [])
+
+    async def _call(self, operation: str, func, *args, **kwargs) -> Any:
+        """Run a Firestore call on the pool, recording its latency (queueing included) under `operation`"""
+        with FIRESTORE_DURATION.labels(operation).time():
+            return await self.run(func, *args, **kwargs)
+
+    def _query(self, collection: str, fields: Optional[List[str]] = None):
+        """Collection query, projected to `fields` when given (an empty list fetches no fields)"""
+        query = self.db.collection(collection)
+        return query.select(fields) if fields is not None else query
+
+    async def stream(self, collection: str, fields: Optional[List[str]] = None) -> List[Any]:
+        """Fetch every document snapshot in a collection, served from the cache when fresh"""
+        docs = self.cache.get(collection, fields)
+        if docs is None:
+            docs = await self._call('stream', lambda: list(self._query(collection, fields).stream()))
+            record_firestore(collection, 'stream', reads=max(1, len(docs)))
+            self.cache.put(collection, docs, fields)
+        return docs
+
+    async def page(self, collection: str, page_size: int, start_after: Optional[str] = None,
+                   end_before: Optional[str] = None, fields: Optional[List[str]] = None) -> Tuple[List[Any], bool]:
+        """Fetch one page ordered by document ID, reading a single extra document as lookahead.
+
+        With `start_after` the page follows that document ID, with `end_before` it precedes it.
+        Returns the page and whether more documents exist in the direction of travel.
+        """
+        def _page():
+            query = self._query(collection, fields).order_by(DOCUMENT_ID)
+            if end_before is not None:
+                # limit_to_last queries cannot be streamed
+                docs = list(query.end_before({DOCUMENT_ID: end_before}).limit_to_last(page_size + 1).get())
+                record_firestore(collection, 'page', reads=max(1, len(docs)))
+                return docs[-page_size:], len(docs) > page_size
+            if start_after is not None:
+                query = query.start_after({DOCUMENT_ID: start_after})
+            docs = list(query.limit(page_size + 1).stream())
+            record_firestore(collection, 'page', reads=max(1, len(docs)))
+            return docs[:page_size], len(docs) > page_size
+        return await self._call('page', _page)
+
+    async def add(self, collection: str, data: Dict[str, Any]) -> str:
+        """Add a document with an auto-generated ID and return that ID"""
+        _, doc_ref = await self._call('add', self.db.collection(collection).add, data)
+        record_firestore(collection, 'add', writes=1)
+        self.cache.invalidate(collection)
+        await self.run(self.counter.increment, collection, 1)
+        item_id = numeric_id(data.get('id'))
+        if item_id is not None:
+            self.ids.set(collection, item_id, doc_ref)
+        return doc_ref.id
+
+    async def add_many(self, collection: str, items: List[Dict[str, Any]]) -> List[str]:
+        """Create documents in one WriteBatch commit (at most 500) and return their IDs"""
+        def _commit():
+            batch = self.db.batch()
+            references = []
+            for data in items:
+                reference = self.db.collection(collection).document()
+                batch.set(reference, data)
+                references.append(reference)
+            batch.commit()
+            return references
+
+        references = await self._call('add_many', _commit)
+        record_firestore(collection, 'add_many', writes=len(references))
+        self.cache.invalidate(collection)
+        await self.run(self.counter.increment, collection, len(references))
+        for data, reference in zip(items, references):
+            item_id = numeric_id(data.get('id'))
+            if item_id is not None:
+                self.ids.set(collection, item_id, reference)
+        return [reference.id for reference in references]
+
+    def _load_ids(self, collection: str):
+        """Build the id map with one projection read that fetches only the `id` field"""
+        docs = self.db.collection(collection).select(['id']).stream()
+        pairs = []
+        scanned = 0
+        for doc in docs:
+            scanned += 1
+            item_id = numeric_id((doc.to_dict() or {}).get('id'))
+            if item_id is not None:
+                pairs.append((item_id, doc.reference))
+        record_firestore(collection, 'load_ids', reads=max(1, scanned))
+        self.ids.load(collection, pairs)
+
+    def _query_id(self, collection: str, item_id: int) -> Optional[Any]:
+        docs = self.db.collection(collection).where('id', '==', item_id).limit(1).stream()
+        doc = next(iter(docs), None)
+        record_firestore(collection, 'query_id', reads=1)
+        return doc.reference if doc else None
+
+    async def get_reference(self, collection: str, item_id: int) -> Optional[Any]:
+        """Resolve a numeric ID to its DocumentReference, locally once the map is loaded"""
+        if not self.ids.is_loaded(collection):
+            await self._call('load_ids', self._load_ids, collection)
+        reference = self.ids.get(collection, item_id)
+        if reference is None:
+            # Documents added outside the bot since the map was loaded
+            reference = await self._call('query_id', self._query_id, collection, item_id)
+            if reference is not None:
+                self.ids.set(collection, item_id, reference)
+        return reference
+
+    async def get_by_id(self, collection: str, item_id: int) -> Optional[Any]:
+        """Return the snapshot whose numeric `id` field matches, or None"""
+        reference = await self.get_reference(collection, item_id)
+        if reference is None:
+            return None
+        snapshot = await self._call('get', reference.get)
+        record_firestore(collection, 'get', reads=1)
+        if not snapshot.exists:
+            self.ids.discard(collection, item_id)
+            return None
+        return snapshot
+
+    async def update(self, collection: str, item_id: int, data: Dict[str, Any]) -> bool:
+        """Update the document with this numeric ID in a single write; False if it no longer exists"""
+        reference = await self.get_reference(collection, item_id)
+        if reference is None:
+            return False
+        try:
+            record_firestore(collection, 'update', writes=1)
+            await self._call('update', reference.update, data)
+        except NotFound:
+            self.ids.discard(collection, item_id)
+            return False
+        finally:
+            self.cache.invalidate(collection)
+        return True
+
+    async def delete(self, collection: str, item_id: int) -> Optional[str]:
+        """Delete the document with this numeric ID in a single write; returns its document ID if it existed"""
+        reference = await self.get_reference(collection, item_id)
+        if reference is None:
+            return None
+        try:
+            # Precondition makes the write fail instead of silently deleting nothing
+            record_firestore(collection, 'delete', writes=1)
+            await self._call('delete', reference.delete, option=self.db.write_option(exists=True))
+        except NotFound:
+            return None
+        finally:
+            self.ids.discard(collection, item_id)
+            self.cache.invalidate(collection)
+        await self.run(self.counter.increment, collection, -1)
+        return reference.id
+
+    async def count_all(self, collections: Iterable[str]) -> Dict[str, int]:
+        return await self._call('count', self.counter.count_all, list(collections))
+
+    async def search(self, collection: str, term: str, fields: List[str]) -> List[Dict[str, Any]]:
+        """Scan the searchable fields of every document; used while no search index is ready"""
+        docs = await self.stream(collection, fields=fields + ['id'])
+        term = term.lower()
+        results = []
+        for doc in docs:
+            data = doc.to_dict()
+            for field_name in fields:
+                field_value = data.get(field_name, '')
+                if isinstance(field_value, str) and term in field_value.lower():
+                    results.append(data)
+                    break
+        return results
@@ -0,0 +1,80 @@
+"""
+Collection export for the Veterinary Dictionary Bot
+Pages through Firestore with cursors and streams rows into a gzip-compressed NDJSON or CSV file
+"""
+
+import csv
+import gzip
+import json
+import os
+import tempfile
+from typing import Any, List, Tuple
+
+# Documents fetched per Firestore page; only one page is held in memory at a time
+EXPORT_PAGE_SIZE = 500
+EXPORT_FORMATS = ('ndjson', 'csv')
+# Telegram bots can upload documents up to 50 MB
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+
+
+def _csv_value(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return str(value)
+
+
+class ExportWriter:
+    def __init__(self, path: str, fmt: str, fields: List[str]):
+        self.fmt = fmt
+        self.columns = ['_docId', 'id'] + [field for field in fields if field != 'id'] + ['createdAt']
+        self._file = gzip.open(path, 'wt', encoding='utf-8', newline='')
+        self._csv = None
+        if fmt == 'csv':
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(self.columns)
+
+    def write(self, docs: List[Any]):
+        for doc in docs:
+            data = doc.to_dict() or {}
+            if self._csv is not None:
+                row = dict(data, _docId=doc.id)
+                self._csv.writerow([_csv_value(row.get(column)) for column in self.columns])
+            else:
+                record = dict(data, _docId=doc.id)
+                self._file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+    def close(self):
+        self._file.close()
+
+
+async def export_collection(store, collection: str, fields: List[str], fmt: str = 'ndjson') -> Tuple[str, int]:
+    """Export a collection to a temporary .gz file and return its path and row count.
+
+    Firestore reads and file writes both run on the store's thread pool, so the event loop stays free.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}")
+
+    fd, path = tempfile.mkstemp(prefix=f'{collection}_', suffix=f'.{fmt}.gz')
+    os.close(fd)
+    rows = 0
+    try:
+        writer = await store.run(ExportWriter, path, fmt, fields)
+        try:
+            cursor = None
+            while True:
+                docs, has_more = await store.page(collection, EXPORT_PAGE_SIZE, start_after=cursor)
+                if docs:
+                    await store.run(writer.write, docs)
+                    rows += len(docs)
+                    cursor = docs[-1].id
+                if not has_more:
+                    break
+        finally:
+            await store.run(writer.close)
+    except Exception:
+        os.remove(path)
+        raise
+    return path, rows
@@ -0,0 +1,98 @@
+"""
+Numeric ID generation for the Veterinary Dictionary Bot
+Snowflake-style IDs: milliseconds since an epoch, a worker number and a per-millisecond sequence, packed into
+53 bits so they stay exact as JavaScript numbers on the website
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import zlib
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# 2024-01-01T00:00:00Z. IDs from here on are far larger than the millisecond timestamps used as IDs before,
+# so old and new items still sort by creation time
+EPOCH_MS = 1704067200000
+TIMESTAMP_BITS = 41
+WORKER_BITS = 5
+SEQUENCE_BITS = 7
+
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+WORKER_SHIFT = SEQUENCE_BITS
+TIMESTAMP_SHIFT = SEQUENCE_BITS + WORKER_BITS
+
+
+def default_worker_id(required: bool = False) -> int:
+    """BOT_WORKER_ID if set, else (unless `required`) a number derived from the host name and process id.
+
+    The derived number collides with another instance's one time in 32, so deployments where several
+    instances can write (webhook replicas, leader-election standbys) must set BOT_WORKER_ID.
+    """
+    configured = os.getenv('BOT_WORKER_ID')
+    if configured is not None:
+        worker_id = int(configured)
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"BOT_WORKER_ID must be between 0 and {MAX_WORKER_ID}")
+        return worker_id
+    if required:
+        raise ValueError(
+            f"BOT_WORKER_ID (0-{MAX_WORKER_ID}, distinct per instance) is required in webhook mode and with leader election"
+        )
+    worker_id = zlib.crc32(f"{socket.gethostname()}:{os.getpid()}".encode()) & MAX_WORKER_ID
+    logger.warning(
+        f"BOT_WORKER_ID not set; using worker id {worker_id} derived from host and pid. "
+        f"Set a distinct BOT_WORKER_ID if more than one instance adds items"
+    )
+    return worker_id
+
+
+class IdGenerator:
+    """Unique, increasing numeric IDs for one bot instance.
+
+    Up to 128 IDs per millisecond; a burst beyond that (e.g. a bulk import) borrows from the following
+    milliseconds instead of waiting, and a clock that steps backwards is ignored until it catches up.
+    Instances writing at the same time need distinct worker ids.
+    """
+
+    def __init__(self, worker_id: int):
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker_id must be between 0 and {MAX_WORKER_ID}")
+        self.worker_id = worker_id
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _now_ms() -> int:
+        return int(time.time() * 1000) - EPOCH_MS
+
+    def next_ids(self, count: int) -> List[int]:
+        """Reserve `count` IDs at once, in increasing order"""
+        ids = []
+        with self._lock:
+            now = self._now_ms()
+            if now > self._last_ms:
+                self._last_ms, self._sequence = now, 0
+            else:
+                self._sequence += 1
+            for _ in range(count):
+                if self._sequence > MAX_SEQUENCE:
+                    self._last_ms, self._sequence = self._last_ms + 1, 0
+                ids.append((self._last_ms << TIMESTAMP_SHIFT) | (self.worker_id << WORKER_SHIFT) | self._sequence)
+                self._sequence += 1
+            # Leave _sequence pointing at the last ID handed out
+            self._sequence -= 1
+        return ids
+
+    def next_id(self) -> int:
+        return self.next_ids(1)[0]
+
+
+def id_timestamp_ms(item_id: int) -> int:
+    """Unix time in milliseconds at which an ID was generated"""
+    return (item_id >> TIMESTAMP_SHIFT) + EPOCH_MS
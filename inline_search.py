@@ -0,0 +1,109 @@
+"""
+Inline mode lookups for the Veterinary Dictionary Bot
+Answers `@bot term` from the in-memory search index: prefix matches across several collections, a typo-tolerant
+fallback, a per-query result cache and a per-user debouncer
+"""
+
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from search_index import SearchIndex, normalize
+
+logger = logging.getLogger(__name__)
+
+# Telegram accepts at most 50 results per answer; further pages are served through next_offset
+PAGE_SIZE = 50
+MAX_RESULTS = 200
+CACHE_SIZE = 1024
+# Below this, a query with no prefix match is too short for the fuzzy fallback to be useful
+FUZZY_MIN_LENGTH = 3
+# Ranks after every prefix match (prefix ranks start with 0 or 1)
+FUZZY_RANK = (2, 0)
+
+
+class InlineSearch:
+    def __init__(self, search_index: SearchIndex, collections: List[str], cache_size: int = CACHE_SIZE):
+        self.search_index = search_index
+        # Listed in tie-break order
+        self.collections = list(collections)
+        self.cache_size = cache_size
+        # normalised query -> (index versions when computed, results)
+        self._cache: 'OrderedDict[str, Tuple[Tuple[int, ...], List[Tuple[str, Dict[str, Any]]]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def is_ready(self) -> bool:
+        return all(self.search_index.is_ready(collection) for collection in self.collections)
+
+    def _versions(self) -> Tuple[int, ...]:
+        return tuple(self.search_index.indexes[collection].version for collection in self.collections)
+
+    def cached(self, query: str) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+        """Results for `query` if they were computed since the index last changed"""
+        key = normalize(query)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or entry[0] != self._versions():
+                return None
+            self._cache.move_to_end(key)
+            return entry[1]
+
+    def lookup(self, query: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """(collection, document) pairs matching `query`, best first, at most MAX_RESULTS"""
+        results = self.cached(query)
+        if results is not None:
+            self.hits += 1
+            return results
+        self.misses += 1
+
+        key = normalize(query)
+        versions = self._versions()
+        results = self._compute(key) if key else []
+        with self._lock:
+            self._cache[key] = (versions, results)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return results
+
+    def _compute(self, query: str) -> List[Tuple[str, Dict[str, Any]]]:
+        ranked = []
+        for order, collection in enumerate(self.collections):
+            matches = self.search_index.prefix_search(collection, query, MAX_RESULTS) or []
+            ranked.extend((rank, order, position, collection, item) for position, (rank, item) in enumerate(matches))
+
+        if not ranked and len(query) >= FUZZY_MIN_LENGTH:
+            # Nothing starts with the query; it may be misspelt
+            for order, collection in enumerate(self.collections):
+                matches = self.search_index.search(collection, query, MAX_RESULTS) or []
+                ranked.extend((FUZZY_RANK, order, position, collection, item) for position, item in enumerate(matches))
+
+        ranked.sort(key=lambda entry: entry[:3])
+        return [(collection, item) for _, _, _, collection, item in ranked[:MAX_RESULTS]]
+
+
+class Debouncer:
+    """Lets only the last of a burst of calls per key through.
+
+    Clients send a new inline query on every keystroke; answering only the one still current after `delay`
+    seconds skips the intermediate ones.
+    """
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self._latest: Dict[Hashable, Hashable] = {}
+
+    async def wait(self, key: Hashable, token: Hashable) -> bool:
+        """Sleep for the delay; True if `token` is still the latest for `key` afterwards"""
+        if self.delay <= 0:
+            return True
+        self._latest[key] = token
+        await asyncio.sleep(self.delay)
+        if self._latest.get(key) != token:
+            return False
+        del self._latest[key]
+        return True
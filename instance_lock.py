@@ -0,0 +1,134 @@
+"""
+Single-instance guard and leader election for the Veterinary Dictionary Bot
+An flock()-based lock stops two pollers on one host; a Firestore lease elects one poller across hosts
+"""
+
+import fcntl
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
+from firebase_admin import firestore
+
+from metrics import record_firestore
+
+logger = logging.getLogger(__name__)
+
+LEASE_COLLECTION = '_meta'
+LEASE_DOCUMENT = 'leader'
+DEFAULT_LEASE_TTL = 10
+
+
+class InstanceLock:
+    """Exclusive lock on a file that the kernel releases when the process exits, however it exits"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def acquire(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            raise RuntimeError("Another bot instance is already running")
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+class LeaderLease:
+    """Time-limited leadership stored in a shared Firestore document.
+
+    The leader renews the lease every ttl/3 seconds; a standby polls at the same interval and
+    takes over once the lease has expired, so failover happens within about one TTL.
+    Expiry compares wall clocks, so hosts should be NTP-synchronised.
+    """
+
+    def __init__(self, db, ttl: float = DEFAULT_LEASE_TTL, instance_id: Optional[str] = None):
+        self.db = db
+        self.ttl = ttl
+        self.instance_id = instance_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _lease_ref(self):
+        return self.db.collection(LEASE_COLLECTION).document(LEASE_DOCUMENT)
+
+    def try_acquire(self) -> bool:
+        """Take or renew the lease if it is free, expired or already ours"""
+        @firestore.transactional
+        def _acquire(transaction, reference):
+            snapshot = reference.get(transaction=transaction)
+            lease = snapshot.to_dict() if snapshot.exists else {}
+            now = time.time()
+            holder = lease.get('holder')
+            if holder and holder != self.instance_id and lease.get('expiresAt', 0) > now:
+                return False
+            transaction.set(reference, {'holder': self.instance_id, 'expiresAt': now + self.ttl})
+            return True
+
+        acquired = _acquire(self.db.transaction(), self._lease_ref())
+        record_firestore(LEASE_COLLECTION, 'leader_lease', reads=1, writes=int(acquired))
+        return acquired
+
+    def wait_for_leadership(self):
+        """Block as a warm standby until this instance holds the lease"""
+        logged = False
+        while not self._stop.is_set():
+            try:
+                if self.try_acquire():
+                    logger.info(f"Acquired leader lease as {self.instance_id}")
+                    return
+            except Exception as e:
+                logger.error(f"Leader lease check failed: {e}")
+            if not logged:
+                logger.info("Another instance holds the leader lease; waiting as standby")
+                logged = True
+            self._stop.wait(self.ttl / 3)
+
+    def start_renewing(self, on_lost: Callable[[], None]):
+        """Renew the lease in a background thread; call `on_lost` once it can no longer be held"""
+        def _renew():
+            valid_until = time.time() + self.ttl
+            while not self._stop.wait(self.ttl / 3):
+                try:
+                    if self.try_acquire():
+                        valid_until = time.time() + self.ttl
+                        continue
+                    logger.error("Leader lease taken over by another instance")
+                except Exception as e:
+                    logger.error(f"Leader lease renewal failed: {e}")
+                    if time.time() < valid_until:
+                        continue  # still ours; retry before it lapses
+                on_lost()
+                return
+
+        self._thread = threading.Thread(target=_renew, name='leader-lease', daemon=True)
+        self._thread.start()
+
+    def release(self):
+        """Stop renewing and hand the lease back so a standby can take over immediately"""
+        self._stop.set()
+
+        @firestore.transactional
+        def _release(transaction, reference):
+            snapshot = reference.get(transaction=transaction)
+            if snapshot.exists and (snapshot.to_dict() or {}).get('holder') == self.instance_id:
+                transaction.delete(reference)
+
+        try:
+            _release(self.db.transaction(), self._lease_ref())
+        except Exception as e:
+            logger.error(f"Failed to release leader lease: {e}")
@@ -0,0 +1,61 @@
+"""
+Firestore snapshot listeners for the Veterinary Dictionary Bot
+One listener per collection, fanned out to every subscriber (search index, statistics, ...)
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Iterable, List
+
+from metrics import record_firestore
+
+logger = logging.getLogger(__name__)
+
+LISTENER_READY_TIMEOUT = 60
+
+# subscriber(collection, docs, changes, read_time); called on the listener's background thread
+Subscriber = Callable[[str, List[Any], List[Any], Any], None]
+
+
+class CollectionWatcher:
+    def __init__(self, db, collections: Iterable[str]):
+        self.db = db
+        self.collections = list(collections)
+        self._subscribers: List[Subscriber] = []
+        self._watches = []
+
+    def subscribe(self, subscriber: Subscriber):
+        self._subscribers.append(subscriber)
+
+    def start(self, timeout: float = LISTENER_READY_TIMEOUT):
+        """Attach a listener to every collection and wait for each initial snapshot"""
+        for collection in self.collections:
+            try:
+                self._listen(collection, timeout)
+            except Exception as e:
+                logger.error(f"Failed to attach snapshot listener for {collection}: {e}")
+
+    def _listen(self, collection: str, timeout: float):
+        loaded = threading.Event()
+
+        def on_snapshot(docs, changes, read_time):
+            # Listeners are billed one read per changed document (the initial snapshot: every document)
+            record_firestore(collection, 'listen', reads=len(changes))
+            for subscriber in self._subscribers:
+                try:
+                    subscriber(collection, docs, changes, read_time)
+                except Exception as e:
+                    logger.error(f"Error applying snapshot of {collection}: {e}")
+            loaded.set()
+
+        self._watches.append(self.db.collection(collection).on_snapshot(on_snapshot))
+        if not loaded.wait(timeout):
+            logger.warning(f"Timed out waiting for initial snapshot of {collection}")
+
+    def stop(self):
+        for watch in self._watches:
+            try:
+                watch.unsubscribe()
+            except Exception as e:
+                logger.error(f"Error stopping snapshot listener: {e}")
+        self._watches = []
@@ -0,0 +1,350 @@
+"""
+Metrics for the Veterinary Dictionary Bot
+Minimal Prometheus-style counters, histograms and scrape-time gauges, rendered in the text exposition format
+and served on a local HTTP port
+"""
+
+import contextvars
+import functools
+import logging
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+
+class _HandlerCall:
+    """One run of a tracked handler; counts at most one error however it surfaces"""
+
+    __slots__ = ('name', 'errored')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.errored = False
+
+    def record_error(self):
+        if not self.errored:
+            self.errored = True
+            HANDLER_ERRORS.labels(self.name).inc()
+
+
+# Handler run in progress in this task, so logged errors can be attributed to it
+current_handler: contextvars.ContextVar[Optional[_HandlerCall]] = contextvars.ContextVar('current_handler', default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: Any):
+        """Child metric for one combination of label values, created on first use"""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        # Unlabelled metrics act as their own single child
+        return self.labels()
+
+    @abstractmethod
+    def _new_child(self):
+        """Fresh value holder for one label combination"""
+
+    @abstractmethod
+    def samples(self) -> Iterable[str]:
+        """Exposition lines for every child, without the HELP and TYPE header"""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class _Value:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+    def samples(self) -> Iterable[str]:
+        for key, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+
+class CallbackMetric(Metric):
+    """Metric whose samples are read from live state at scrape time"""
+
+    def __init__(self, name: str, documentation: str, collect: Callable[[], Any], labelnames: Sequence[str] = (),
+                 metric_type: str = 'gauge'):
+        super().__init__(name, documentation, labelnames)
+        self.type = metric_type
+        # Unlabelled: collect() returns a number; labelled: an iterable of (label values, number)
+        self.collect = collect
+
+    def _new_child(self):
+        raise TypeError(f"{self.name} is read at scrape time and has no children to update")
+
+    def samples(self) -> Iterable[str]:
+        try:
+            collected = self.collect()
+        except Exception as e:
+            logger.error(f"Failed to collect {self.name}: {e}")
+            return
+        if not self.labelnames:
+            collected = [((), collected)]
+        for key, value in collected:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class _HistogramValue:
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+    def time(self):
+        return _Timer(self)
+
+
+class _Timer:
+    def __init__(self, child: _HistogramValue):
+        self._child = child
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._child.observe(time.perf_counter() - self._started)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def samples(self) -> Iterable[str]:
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        """Add a metric; registering a name again replaces the old one (e.g. a second bot instance)"""
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def callback_metric(name: str, documentation: str, collect: Callable[[], Any], labelnames: Sequence[str] = (),
+                    metric_type: str = 'gauge') -> CallbackMetric:
+    return REGISTRY.register(CallbackMetric(name, documentation, collect, labelnames, metric_type))
+
+
+HANDLER_DURATION = histogram(
+    'vetdict_handler_duration_seconds', "Time spent in each Telegram update handler", ['handler']
+)
+HANDLER_ERRORS = counter(
+    'vetdict_handler_errors_total', "Handler runs that raised or logged an error", ['handler']
+)
+FIRESTORE_REQUESTS = counter(
+    'vetdict_firestore_requests_total', "Firestore calls made", ['collection', 'operation']
+)
+FIRESTORE_READS = counter(
+    'vetdict_firestore_documents_read_total', "Documents read (billed reads) from Firestore",
+    ['collection', 'operation']
+)
+FIRESTORE_WRITES = counter(
+    'vetdict_firestore_documents_written_total', "Documents written to or deleted from Firestore",
+    ['collection', 'operation']
+)
+FIRESTORE_DURATION = histogram(
+    'vetdict_firestore_request_duration_seconds', "Firestore call latency, including thread-pool wait",
+    ['operation']
+)
+
+
+def record_firestore(collection: str, operation: str, reads: int = 0, writes: int = 0):
+    """Count one Firestore call and the documents it read or wrote"""
+    FIRESTORE_REQUESTS.labels(collection, operation).inc()
+    if reads:
+        FIRESTORE_READS.labels(collection, operation).inc(reads)
+    if writes:
+        FIRESTORE_WRITES.labels(collection, operation).inc(writes)
+
+
+def track_handler(handler: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Wrap an update handler to record its latency and errors under its function name"""
+    name = handler.__name__
+
+    @functools.wraps(handler)
+    async def wrapper(update, context):
+        call = _HandlerCall(name)
+        token = current_handler.set(call)
+        started = time.perf_counter()
+        try:
+            return await handler(update, context)
+        except Exception:
+            # Already counted if the handler logged the error before re-raising it
+            call.record_error()
+            raise
+        finally:
+            HANDLER_DURATION.labels(name).observe(time.perf_counter() - started)
+            current_handler.reset(token)
+
+    return wrapper
+
+
+class HandlerErrorCounter(logging.Handler):
+    """Counts ERROR log records emitted while a tracked handler runs.
+
+    Handlers catch their own exceptions and log them, so the log is where their errors surface. Each handler
+    run counts once, however many errors it logs or raises.
+    """
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+
+    def emit(self, record: logging.LogRecord):
+        call = current_handler.get()
+        if call is not None:
+            call.record_error()
+
+
+_error_counter = HandlerErrorCounter()
+
+
+def install_error_counter():
+    root = logging.getLogger()
+    if _error_counter not in root.handlers:
+        root.addHandler(_error_counter)
+
+
+class MetricsServer:
+    """Serves GET /metrics from the registry; bind to localhost unless a scraper needs remote access"""
+
+    def __init__(self, registry: Registry = REGISTRY, listen: str = '127.0.0.1', port: int = 9464):
+        self.registry = registry
+        self.listen = listen
+        self.port = port
+        self._runner = None
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.registry.render().encode('utf-8'), headers={'Content-Type': CONTENT_TYPE})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle_metrics)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.listen, self.port).start()
+        logger.info(f"Metrics served on http://{self.listen}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
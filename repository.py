@@ -0,0 +1,91 @@
+"""
+Storage interface for the Veterinary Dictionary Bot
+Every backend (Firestore, SQLite) exposes the same async operations to the handlers
+"""
+
+import asyncio
+import functools
+import secrets
+import string
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Same shape as Firestore auto-generated document IDs
+AUTO_ID_ALPHABET = string.ascii_letters + string.digits
+AUTO_ID_LENGTH = 20
+
+
+def auto_id() -> str:
+    return ''.join(secrets.choice(AUTO_ID_ALPHABET) for _ in range(AUTO_ID_LENGTH))
+
+
+def numeric_id(value) -> Optional[int]:
+    """The user-facing numeric `id` of a document as an int, or None if it has none"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Repository(ABC):
+    """Async data access used by VetDictionaryBot.
+
+    Documents returned by reads expose `.id` (the backend document ID) and `.to_dict()`.
+    Blocking backend calls run on a bounded thread pool via `run`, never on the event loop.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking callable on the repository's thread pool and await its result"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    @abstractmethod
+    async def add(self, collection: str, data: Dict[str, Any]) -> str:
+        """Add a document with an auto-generated ID and return that ID"""
+
+    @abstractmethod
+    async def add_many(self, collection: str, items: List[Dict[str, Any]]) -> List[str]:
+        """Add up to 500 documents in one atomic write and return their IDs"""
+
+    @abstractmethod
+    async def get_by_id(self, collection: str, item_id: int) -> Optional[Any]:
+        """Return the document whose numeric `id` field matches, or None"""
+
+    @abstractmethod
+    async def update(self, collection: str, item_id: int, data: Dict[str, Any]) -> bool:
+        """Update the document with this numeric ID; False if it does not exist"""
+
+    @abstractmethod
+    async def delete(self, collection: str, item_id: int) -> Optional[str]:
+        """Delete the document with this numeric ID; returns its document ID if it existed"""
+
+    @abstractmethod
+    async def page(self, collection: str, page_size: int, start_after: Optional[str] = None,
+                   end_before: Optional[str] = None, fields: Optional[List[str]] = None) -> Tuple[List[Any], bool]:
+        """Fetch one page ordered by document ID, after `start_after` or before `end_before`.
+
+        Returns the page and whether more documents exist in the direction of travel.
+        """
+
+    @abstractmethod
+    async def stream(self, collection: str, fields: Optional[List[str]] = None) -> List[Any]:
+        """Fetch every document in a collection, projected to `fields` when given"""
+
+    @abstractmethod
+    async def count_all(self, collections: Iterable[str]) -> Dict[str, int]:
+        """Count the documents in each collection"""
+
+    async def count(self, collection: str) -> int:
+        return (await self.count_all([collection]))[collection]
+
+    @abstractmethod
+    async def search(self, collection: str, term: str, fields: List[str]) -> List[Dict[str, Any]]:
+        """Case-insensitive substring search over `fields`, ordered by document ID"""
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,130 @@
+"""
+Field schemas for the Veterinary Dictionary Bot
+Declarative per-collection field rules (type, required, numeric range, URL/email format, default), compiled once
+into a list of small per-field checks that coerce values in place and report errors by field
+"""
+
+import math
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+URL_PATTERN = re.compile(r'^https?://[^\s/?#]+\.[^\s/?#]+(?:[/?#]\S*)?$', re.IGNORECASE)
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+TYPES = ('str', 'int', 'float', 'url', 'email')
+# Shorthand for the most common rule
+REQUIRED = {'required': True}
+# What users type in the add/edit flow to leave an optional field blank (compared casefolded)
+SKIP_VALUES = frozenset({'-', '—', 'none', 'skip', 'n/a', 'null'})
+
+# A compiled check takes the record and the error map and may rewrite its field
+Check = Callable[[Dict[str, Any], Dict[str, str]], None]
+
+
+def _to_text(value: Any) -> str:
+    return '' if value is None else value.strip() if isinstance(value, str) else str(value).strip()
+
+
+def _parse_float(text: str) -> float:
+    number = float(text)
+    if not math.isfinite(number):
+        raise ValueError(text)
+    return number
+
+
+def _parse_int(text: str) -> int:
+    number = _parse_float(text)
+    if not number.is_integer():
+        raise ValueError(text)
+    return int(number)
+
+
+def _compile_field(field: str, rule: Dict[str, Any]) -> Check:
+    field_type = rule.get('type', 'str')
+    if field_type not in TYPES:
+        raise ValueError(f"Unknown type '{field_type}' for field '{field}'")
+    required = rule.get('required', False)
+    default = rule.get('default')
+    minimum, maximum = rule.get('min'), rule.get('max')
+    parse = {'int': _parse_int, 'float': _parse_float}.get(field_type)
+    pattern = {'url': URL_PATTERN, 'email': EMAIL_PATTERN}.get(field_type)
+    type_message = f"Field '{field}' must be {'a whole number' if field_type == 'int' else 'a number'}"
+    format_message = f"Field '{field}' must be a valid {'URL (http:// or https://)' if field_type == 'url' else 'email address'}"
+
+    def check(data: Dict[str, Any], errors: Dict[str, str]):
+        text = _to_text(data.get(field))
+        if not required and text.casefold() in SKIP_VALUES:
+            text = ''
+        if not text:
+            if default is not None:
+                data[field] = default
+            elif required:
+                errors[field] = f"Field '{field}' is required and cannot be empty"
+            else:
+                data[field] = ''
+            return
+
+        if parse is not None:
+            try:
+                value = parse(text)
+            except ValueError:
+                errors[field] = type_message
+                return
+            if minimum is not None and value < minimum:
+                errors[field] = f"Field '{field}' must be at least {minimum}"
+                return
+            if maximum is not None and value > maximum:
+                errors[field] = f"Field '{field}' must be at most {maximum}"
+                return
+            data[field] = value
+            return
+
+        if pattern is not None and not pattern.match(text):
+            errors[field] = format_message
+            return
+        data[field] = text
+
+    return check
+
+
+def _compile_less_than(field: str, other: str) -> Check:
+    def check(data: Dict[str, Any], errors: Dict[str, str]):
+        if field in errors or other in errors:
+            return
+        low, high = data.get(field), data.get(other)
+        if isinstance(low, (int, float)) and isinstance(high, (int, float)) and low >= high:
+            errors[field] = f"{field} must be less than {other}"
+
+    return check
+
+
+class Schema:
+    """Compiled rules for one collection; fields without a rule are optional strings"""
+
+    def __init__(self, fields: List[str], rules: Optional[Dict[str, Dict[str, Any]]] = None):
+        rules = rules or {}
+        unknown = set(rules) - set(fields)
+        if unknown:
+            raise ValueError(f"Schema rules for unknown fields: {', '.join(sorted(unknown))}")
+        self.fields = list(fields)
+        self._checks: List[Check] = [_compile_field(field, rules.get(field, {})) for field in self.fields]
+        # Cross-field rules run after every field has been coerced
+        self._checks.extend(
+            _compile_less_than(field, rule['less_than']) for field, rule in rules.items() if 'less_than' in rule
+        )
+
+    def apply(self, data: Dict[str, Any]) -> Dict[str, str]:
+        """Coerce `data` in place; returns {field: error message} in field order, empty when the record is valid"""
+        errors: Dict[str, str] = {}
+        for check in self._checks:
+            check(data, errors)
+        return errors
+
+
+def format_errors(errors: Dict[str, str]) -> str:
+    return '; '.join(errors.values())
+
+
+def compile_schemas(collections: Dict[str, Dict[str, Any]]) -> Dict[str, Schema]:
+    """One compiled Schema per collection, from each collection's `fields` and `schema` entries"""
+    return {key: Schema(info['fields'], info.get('schema')) for key, info in collections.items()}
@@ -0,0 +1,385 @@
+"""
+In-memory search index for the Veterinary Dictionary Bot
+Ranked substring and typo-tolerant (trigram) search over Unicode-normalised text, with Arabic-script
+letter folding for Kurdish/Arabic terms; kept fresh by the bot's writes and Firestore snapshot listeners
+"""
+
+import bisect
+import functools
+import heapq
+import itertools
+import logging
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+from metrics import record_firestore
+
+logger = logging.getLogger(__name__)
+
+# Relevance of each kind of match, before field weighting
+SCORE_EXACT = 1.0
+SCORE_PREFIX = 0.9
+SCORE_WORD_PREFIX = 0.8
+SCORE_SUBSTRING = 0.7
+SCORE_FUZZY = 0.6
+# Each field after a collection's first (display) field weighs this much less than the one before it
+FIELD_WEIGHT_STEP = 0.05
+# Among equal matches, shorter values rank first
+LENGTH_PENALTY = 1e-5
+# Query words shorter than this are only matched as substrings
+FUZZY_MIN_LENGTH = 3
+# Minimum mean trigram (Dice) similarity for a fuzzy match
+FUZZY_MIN_SIMILARITY = 0.45
+# Documents sharing the most trigrams with the query that are checked for fuzzy matches
+FUZZY_CANDIDATES = 200
+# Trigrams in more than this share of documents say little about a match and are not used to find candidates
+FUZZY_COMMON_GRAM_RATIO = 0.05
+
+# Arabic-script letters typed differently on Arabic, Persian and Kurdish keyboards are folded to one form.
+# Hamza and harakat are combining marks and are already stripped by normalize().
+ARABIC_SCRIPT_FOLDING = str.maketrans({
+    '\u0671': '\u0627',  # alef wasla -> alef
+    '\u0649': '\u064a',  # alef maksura -> yeh
+    '\u06cc': '\u064a',  # Farsi yeh -> yeh
+    '\u06ce': '\u064a',  # Kurdish yeh with small v -> yeh
+    '\u06a9': '\u0643',  # keheh -> kaf
+    '\u0629': '\u0647',  # teh marbuta -> heh
+    '\u06d5': '\u0647',  # ae -> heh
+    '\u06be': '\u0647',  # heh doachashmee -> heh
+    '\u06c1': '\u0647',  # heh goal -> heh
+    '\u06c6': '\u0648',  # oe -> waw
+    '\u06b5': '\u0644',  # lam with small v -> lam
+    '\u0695': '\u0631',  # reh with small v below -> reh
+    '\u0640': None,       # tatweel
+    '\u200c': None,       # zero-width non-joiner
+    '\u200d': None,       # zero-width joiner
+    **{chr(0x0660 + i): str(i) for i in range(10)},  # Arabic-Indic digits
+    **{chr(0x06f0 + i): str(i) for i in range(10)},  # Extended Arabic-Indic digits
+})
+_SEPARATORS = re.compile(r'[\W_]+')
+
+
+def normalize(text: str) -> str:
+    """Case-fold, strip diacritics, fold Arabic-script variants and reduce punctuation to single spaces"""
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return _SEPARATORS.sub(' ', text.translate(ARABIC_SCRIPT_FOLDING)).strip()
+
+
+@functools.lru_cache(maxsize=65536)
+def word_grams(word: str) -> FrozenSet[str]:
+    """Trigrams of a word padded like pg_trgm, so word starts and ends carry weight"""
+    padded = f'  {word} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def _field_weights(count: int) -> List[float]:
+    return [1.0 - FIELD_WEIGHT_STEP * i for i in range(count)]
+
+
+def _match_score(query: str, texts: Sequence[Tuple[int, str]], weights: Sequence[float]) -> float:
+    """Best weighted exact/prefix/substring score of `query` over normalised field values; 0 if none match"""
+    best = 0.0
+    for index, value in texts:
+        position = value.find(query)
+        if position < 0:
+            continue
+        if position == 0:
+            kind = SCORE_EXACT if len(value) == len(query) else SCORE_PREFIX
+        elif value[position - 1] == ' ' or f' {query}' in value:
+            kind = SCORE_WORD_PREFIX
+        else:
+            kind = SCORE_SUBSTRING
+        best = max(best, kind * weights[index] - len(value) * LENGTH_PENALTY)
+    return best
+
+
+def _normalized_texts(data: Dict[str, Any], fields: Sequence[str]) -> List[Tuple[int, str]]:
+    texts = []
+    for index, field in enumerate(fields):
+        value = data.get(field)
+        if isinstance(value, str):
+            normalized = normalize(value)
+            if normalized:
+                texts.append((index, normalized))
+    return texts
+
+
+def rank_results(items: List[Dict[str, Any]], term: str, fields: Sequence[str]) -> List[Dict[str, Any]]:
+    """Order already-matched items (e.g. from a backend scan) by the index's relevance score"""
+    query = normalize(term)
+    if not query:
+        return items
+    weights = _field_weights(len(fields))
+    scores = [_match_score(query, _normalized_texts(item, fields), weights) for item in items]
+    order = sorted(range(len(items)), key=lambda i: -scores[i])  # stable: ties keep backend order
+    return [items[i] for i in order]
+
+
+class CollectionIndex:
+    def __init__(self, fields: Iterable[str], prefix_fields: Iterable[str] = ()):
+        self.fields = list(fields)
+        self.weights = _field_weights(len(self.fields))
+        self.ready = False
+        # Bumped on every change so callers can tell when cached results are stale
+        self.version = 0
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        # doc_id -> (field index, normalised value) for every searchable field
+        self._texts: Dict[str, List[Tuple[int, str]]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        # Sorted (key, doc_id, is_word) for prefix lookups: each prefix field's value, and the value from each
+        # later word onwards (is_word=1); sorted lazily after bulk loads
+        self._prefix_field_indexes = {self.fields.index(field) for field in prefix_fields}
+        self._prefixes: List[Tuple[str, str, int]] = []
+        self._prefixes_sorted = True
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    @staticmethod
+    def _doc_grams(texts: List[Tuple[int, str]]) -> Set[str]:
+        grams = set()
+        for _, value in texts:
+            for word in value.split():
+                grams |= word_grams(word)
+        return grams
+
+    def _prefix_entries(self, doc_id: str, texts: List[Tuple[int, str]]) -> Set[Tuple[str, str, int]]:
+        entries = set()
+        for index, value in texts:
+            if index not in self._prefix_field_indexes:
+                continue
+            entries.add((value, doc_id, 0))
+            entries.update((value[i + 1:], doc_id, 1) for i, ch in enumerate(value) if ch == ' ')
+        return entries
+
+    def _sort_prefixes(self):
+        if not self._prefixes_sorted:
+            self._prefixes.sort()
+            self._prefixes_sorted = True
+
+    def add(self, doc_id: str, data: Dict[str, Any]):
+        """Index (or re-index) a document; only searchable fields and `id` are kept"""
+        stored = {key: data[key] for key in self.fields + ['id'] if key in data}
+        texts = _normalized_texts(stored, self.fields)
+        with self._lock:
+            self.remove(doc_id)
+            self._docs[doc_id] = stored
+            self._texts[doc_id] = texts
+            for gram in self._doc_grams(texts):
+                self._postings.setdefault(gram, set()).add(doc_id)
+            for entry in self._prefix_entries(doc_id, texts):
+                if self.ready and self._prefixes_sorted:
+                    bisect.insort(self._prefixes, entry)
+                else:
+                    # Bulk load: append now, sort once on first lookup
+                    self._prefixes.append(entry)
+                    self._prefixes_sorted = False
+            self.version += 1
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            if self._docs.pop(doc_id, None) is None:
+                return
+            texts = self._texts.pop(doc_id)
+            for gram in self._doc_grams(texts):
+                posting = self._postings.get(gram)
+                if posting is not None:
+                    posting.discard(doc_id)
+                    if not posting:
+                        del self._postings[gram]
+            entries = self._prefix_entries(doc_id, texts)
+            if entries:
+                self._sort_prefixes()
+                for entry in entries:
+                    position = bisect.bisect_left(self._prefixes, entry)
+                    if position < len(self._prefixes) and self._prefixes[position] == entry:
+                        del self._prefixes[position]
+            self.version += 1
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
+            self._texts.clear()
+            self._postings.clear()
+            self._prefixes.clear()
+            self._prefixes_sorted = True
+            self.version += 1
+
+    def prefix_search(self, prefix: str, limit: int) -> List[Tuple[Tuple[int, int], Dict[str, Any]]]:
+        """Documents with a prefix-field value (or a word in it) starting with `prefix`, ranked.
+
+        Returns (rank, document) pairs; lower ranks are better, so results from several indexes can be merged.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            self._sort_prefixes()
+            start = bisect.bisect_left(self._prefixes, (prefix,))
+            # Whole values before word matches, then shorter (closer) keys first
+            ranked: Dict[str, Tuple[int, int]] = {}
+            for key, doc_id, is_word in itertools.islice(self._prefixes, start, None):
+                if not key.startswith(prefix):
+                    break
+                rank = (is_word, len(key))
+                if doc_id not in ranked or rank < ranked[doc_id]:
+                    ranked[doc_id] = rank
+            best = heapq.nsmallest(limit, ranked.items(), key=lambda item: (item[1], item[0]))
+            return [(rank, dict(self._docs[doc_id])) for doc_id, rank in best]
+
+    @staticmethod
+    def _phrase_grams(words: List[str]) -> Set[str]:
+        """Trigrams every document containing the multi-word phrase must have.
+
+        Inside the phrase, the first word ends a document word, the last starts one and any others are whole words.
+        """
+        padded = [f'{words[0]} '] + [f'  {word} ' for word in words[1:-1]] + [f'  {words[-1]}']
+        return {text[i:i + 3] for text in padded for i in range(len(text) - 2)}
+
+    def _candidates(self, query: str) -> Set[str]:
+        """Documents that may contain `query`, before verification"""
+        words = query.split()
+        if len(words) > 1:
+            grams = self._phrase_grams(words)
+        elif len(query) >= 3:
+            # Every trigram of the word appears among the padded trigrams of a word containing it
+            grams = {query[i:i + 3] for i in range(len(query) - 2)}
+        else:
+            candidates = set()
+            for gram, posting in self._postings.items():
+                if query in gram:
+                    candidates |= posting
+            return candidates
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        return set(postings[0]).intersection(*postings[1:])
+
+    def _substring_matches(self, query: str) -> Dict[str, float]:
+        candidates = self._candidates(query)
+        scores = {}
+        for doc_id in candidates:
+            score = _match_score(query, self._texts[doc_id], self.weights)
+            if score > 0:
+                scores[doc_id] = score
+        return scores
+
+    def _fuzzy_matches(self, query: str, exclude: Dict[str, float]) -> Dict[str, float]:
+        """Score documents whose words are close to the query words by trigram similarity"""
+        query_grams = [word_grams(word) for word in query.split() if len(word) >= FUZZY_MIN_LENGTH]
+        if not query_grams:
+            return {}
+        postings = sorted((self._postings.get(gram, set()) for grams in query_grams for gram in grams), key=len)
+        limit = max(FUZZY_CANDIDATES, len(self._docs) * FUZZY_COMMON_GRAM_RATIO)
+        # Rare trigrams pick the candidates; if every trigram is common, the three rarest still do
+        selective = [posting for posting in postings if len(posting) <= limit] or postings[:3]
+        shared: Counter = Counter()
+        for posting in selective:
+            shared.update(posting)
+        candidates = heapq.nlargest(
+            FUZZY_CANDIDATES, (doc_id for doc_id in shared if doc_id not in exclude), key=shared.__getitem__
+        )
+
+        scores = {}
+        for doc_id in candidates:
+            texts = self._texts[doc_id]
+            similarity = 0.0
+            weighted = 0.0
+            for grams in query_grams:
+                best, best_weighted = 0.0, 0.0
+                for index, value in texts:
+                    for word in value.split():
+                        score = _similarity(grams, word_grams(word))
+                        if score > best:
+                            best, best_weighted = score, score * self.weights[index]
+                similarity += best
+                weighted += best_weighted
+            if similarity / len(query_grams) >= FUZZY_MIN_SIMILARITY:
+                scores[doc_id] = SCORE_FUZZY * weighted / len(query_grams)
+        return scores
+
+    def search(self, term: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Documents matching `term`, best first: exact, prefix and substring matches, then close misspellings"""
+        query = normalize(term)
+        with self._lock:
+            if not query:
+                doc_ids = sorted(self._docs)[:limit]
+                return [dict(self._docs[doc_id]) for doc_id in doc_ids]
+            scores = self._substring_matches(query)
+            scores.update(self._fuzzy_matches(query, scores))
+            # Ties (equal score) fall back to document ID order, as Firestore streams them
+            key = lambda item: (-item[1], item[0])
+            ranked = heapq.nsmallest(limit, scores.items(), key=key) if limit else sorted(scores.items(), key=key)
+            return [dict(self._docs[doc_id]) for doc_id, _ in ranked]
+
+
+class SearchIndex:
+    def __init__(self, db, collections: Dict[str, Dict[str, Any]]):
+        self.db = db
+        self.indexes = {
+            key: CollectionIndex(info['fields'], info.get('prefix_fields', ()))
+            for key, info in collections.items()
+        }
+
+    def is_ready(self, collection: str) -> bool:
+        index = self.indexes.get(collection)
+        return index is not None and index.ready
+
+    def search(self, collection: str, term: str, limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """Return ranked matches from the index, or None if the collection is not indexed yet"""
+        if not self.is_ready(collection):
+            return None
+        return self.indexes[collection].search(term, limit)
+
+    def prefix_search(self, collection: str, prefix: str, limit: int) -> Optional[List[Tuple[Tuple[int, int], Dict[str, Any]]]]:
+        """Ranked prefix matches over the collection's prefix fields, or None if it is not indexed yet"""
+        if not self.is_ready(collection):
+            return None
+        return self.indexes[collection].prefix_search(prefix, limit)
+
+    def add(self, collection: str, doc_id: str, data: Dict[str, Any]):
+        if collection in self.indexes:
+            self.indexes[collection].add(doc_id, data)
+
+    def remove(self, collection: str, doc_id: str):
+        if collection in self.indexes:
+            self.indexes[collection].remove(doc_id)
+
+    def build(self, collection: str):
+        """Load a collection with a single read projected to the searchable fields"""
+        index = self.indexes[collection]
+        index.clear()
+        for doc in self.db.collection(collection).select(index.fields + ['id']).stream():
+            index.add(doc.id, doc.to_dict())
+        record_firestore(collection, 'index_build', reads=max(1, len(index)))
+        index.ready = True
+
+    def build_all(self):
+        """Load every index with one projected read per collection (used when listeners are off)"""
+        for collection in self.indexes:
+            try:
+                self.build(collection)
+                logger.info(f"Search index for {collection} ready ({len(self.indexes[collection])} documents)")
+            except Exception as e:
+                logger.error(f"Failed to build search index for {collection}: {e}")
+
+    def on_snapshot(self, collection: str, docs, changes, read_time):
+        """CollectionWatcher subscriber: the initial snapshot loads the index, later ones keep it fresh"""
+        index = self.indexes.get(collection)
+        if index is None:
+            return
+        for change in changes:
+            if change.type.name == 'REMOVED':
+                index.remove(change.document.id)
+            else:
+                index.add(change.document.id, change.document.to_dict())
+        if not index.ready:
+            index.ready = True
+            logger.info(f"Search index for {collection} ready ({len(index)} documents)")
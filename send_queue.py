@@ -0,0 +1,176 @@
+"""
+Outbound flood control for the Veterinary Dictionary Bot
+A rate limiter for every Bot API call the application makes: sends and edits wait for per-chat and global
+budgets, RetryAfter responses are retried after the requested pause, and rapid edits of one message are merged
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Coroutine, Dict, Hashable, List, Optional, Tuple, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from metrics import counter, histogram
+from throttle import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Telegram allows about 30 messages a second overall, about one a second per private chat (short bursts are
+# tolerated) and 20 a minute per group. Each budget's burst plus one second (or minute) of refill stays within them.
+GLOBAL_RATE, GLOBAL_BURST = 25.0, 5
+PRIVATE_CHAT_RATE, PRIVATE_CHAT_BURST = 1.0, 3
+GROUP_CHAT_RATE, GROUP_CHAT_BURST = 17 / 60, 3
+MAX_RETRIES = 3
+MAX_CHATS = 10000
+
+# Endpoints that post or change messages count against the budgets; answers to queries and reads do not
+BUDGETED_PREFIXES = ('send', 'edit', 'copy', 'forward')
+
+SEND_WAIT = histogram(
+    'vetdict_telegram_send_wait_seconds', "Time outbound requests waited for a rate budget",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+RETRY_AFTERS = counter('vetdict_telegram_retry_after_total', "RetryAfter (429) responses from Telegram", ['endpoint'])
+EDITS_COALESCED = counter('vetdict_telegram_edits_coalesced_total', "Edits replaced by a newer edit before being sent")
+
+JSONResult = Union[bool, Dict[str, Any], List[Dict[str, Any]]]
+
+
+class _PendingEdit:
+    __slots__ = ('args', 'kwargs', 'future', 'waiters')
+
+    def __init__(self, args: Any, kwargs: Dict[str, Any]):
+        self.args = args
+        self.kwargs = kwargs
+        self.future: Optional[asyncio.Future] = None
+        self.waiters = 0
+
+
+class SendScheduler(BaseRateLimiter):
+    """Throttles sends and edits to stay under Telegram's flood limits instead of reacting to 429s.
+
+    An edit of a message that already has an edit through the same endpoint waiting for budget replaces that
+    edit's content. Both callers then get the result of the single request that is sent.
+    """
+
+    def __init__(self, global_rate: float = GLOBAL_RATE, global_burst: int = GLOBAL_BURST,
+                 max_retries: int = MAX_RETRIES):
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+        self.max_retries = max_retries
+        self._global: Optional[TokenBucket] = None
+        # Least recently used first; chats idle long enough to drop have refilled their budget anyway
+        self._chats: 'OrderedDict[Hashable, TokenBucket]' = OrderedDict()
+        self._pending_edits: Dict[Tuple[Hashable, Any, str], _PendingEdit] = {}
+
+    async def initialize(self):
+        self._global = TokenBucket(self.global_burst, self.global_rate, time.monotonic())
+
+    async def shutdown(self):
+        self._chats.clear()
+        self._pending_edits.clear()
+
+    def _chat_budget(self, chat_id: Hashable, now: float) -> TokenBucket:
+        budget = self._chats.get(chat_id)
+        if budget is None:
+            # Private chats have positive ids; groups, supergroups and channels negative ids or @usernames
+            private = isinstance(chat_id, int) and chat_id > 0
+            budget = self._chats[chat_id] = (
+                TokenBucket(PRIVATE_CHAT_BURST, PRIVATE_CHAT_RATE, now) if private
+                else TokenBucket(GROUP_CHAT_BURST, GROUP_CHAT_RATE, now)
+            )
+            while len(self._chats) > MAX_CHATS:
+                self._chats.popitem(last=False)
+        else:
+            self._chats.move_to_end(chat_id)
+        return budget
+
+    async def _wait_for_budget(self, chat_id: Optional[Hashable]):
+        started = time.monotonic()
+        if chat_id is not None:
+            wait = self._chat_budget(chat_id, started).reserve(started)
+            if wait:
+                await asyncio.sleep(wait)
+        if self._global is None:
+            self._global = TokenBucket(self.global_burst, self.global_rate, started)
+        wait = self._global.reserve(time.monotonic())
+        if wait:
+            await asyncio.sleep(wait)
+        SEND_WAIT.observe(time.monotonic() - started)
+
+    async def _call(self, callback: Callable[..., Coroutine[Any, Any, JSONResult]], args: Any,
+                    kwargs: Dict[str, Any], endpoint: str, chat_id: Optional[Hashable],
+                    budgeted: bool = True) -> JSONResult:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                RETRY_AFTERS.labels(endpoint).inc()
+                if attempt == self.max_retries:
+                    raise
+                delay = float(e.retry_after)
+                logger.warning(f"Telegram asked to retry {endpoint} after {delay}s (attempt {attempt + 1})")
+                if not budgeted:
+                    await asyncio.sleep(delay)
+                    continue
+                # Pause the chat's budget (or the global one if there is no chat) so requests queued behind this
+                # one wait too, then take a new place in line
+                now = time.monotonic()
+                if chat_id is not None:
+                    self._chat_budget(chat_id, now).pause(delay, now)
+                elif self._global is not None:
+                    self._global.pause(delay, now)
+                await self._wait_for_budget(chat_id)
+
+    async def process_request(self, callback: Callable[..., Coroutine[Any, Any, JSONResult]], args: Any,
+                              kwargs: Dict[str, Any], endpoint: str, data: Dict[str, Any],
+                              rate_limit_args: Optional[Any]) -> JSONResult:
+        if not endpoint.startswith(BUDGETED_PREFIXES):
+            return await self._call(callback, args, kwargs, endpoint, None, budgeted=False)
+
+        chat_id = data.get('chat_id')
+        if endpoint.startswith('edit') and data.get('message_id') is not None:
+            # Only edits through the same endpoint replace each other: a markup edit must not drop a text edit
+            key = (chat_id, data['message_id'], endpoint)
+            return await self._edit(callback, args, kwargs, endpoint, chat_id, key)
+
+        await self._wait_for_budget(chat_id)
+        return await self._call(callback, args, kwargs, endpoint, chat_id)
+
+    async def _edit(self, callback: Callable[..., Coroutine[Any, Any, JSONResult]], args: Any,
+                    kwargs: Dict[str, Any], endpoint: str, chat_id: Optional[Hashable],
+                    key: Tuple[Hashable, Any, str]) -> JSONResult:
+        pending = self._pending_edits.get(key)
+        if pending is not None:
+            # Not sent yet: send this newer content instead and share the result
+            pending.args, pending.kwargs = args, kwargs
+            EDITS_COALESCED.inc()
+        else:
+            pending = self._pending_edits[key] = _PendingEdit(args, kwargs)
+            # The edit runs as its own task so a caller that gives up doesn't take the others' edit with it
+            pending.future = asyncio.ensure_future(self._send_edit(callback, endpoint, chat_id, key, pending))
+
+        pending.waiters += 1
+        try:
+            return await asyncio.shield(pending.future)
+        finally:
+            pending.waiters -= 1
+            if not pending.waiters and not pending.future.done():
+                # Every caller was cancelled; nobody wants the result, and a later edit must not join this one
+                if self._pending_edits.get(key) is pending:
+                    del self._pending_edits[key]
+                pending.future.cancel()
+
+    async def _send_edit(self, callback: Callable[..., Coroutine[Any, Any, JSONResult]], endpoint: str,
+                         chat_id: Optional[Hashable], key: Tuple[Hashable, Any, str],
+                         pending: _PendingEdit) -> JSONResult:
+        try:
+            await self._wait_for_budget(chat_id)
+        finally:
+            # From here on the request is in flight, so a later edit must be sent after it
+            if self._pending_edits.get(key) is pending:
+                del self._pending_edits[key]
+        return await self._call(callback, pending.args, pending.kwargs, endpoint, chat_id)
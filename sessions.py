@@ -0,0 +1,184 @@
+"""
+Session storage for the Veterinary Dictionary Bot
+Bounded in-memory sessions with idle expiry, optionally written through to SQLite to survive restarts
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IDLE_TIMEOUT = 3600
+DEFAULT_MAX_ENTRIES = 10000
+# Seconds between sweeps of expired rows from the SQLite store
+PURGE_INTERVAL = 300
+
+
+class Session:
+    """Conversation state for one user; supports the dict-style access the handlers use"""
+
+    __slots__ = ('action', 'collection', 'current_field', 'data', 'waiting_for', 'item_id', 'doc_id', 'last_seen')
+    KEYS = __slots__[:-1]
+
+    def __init__(self, **values):
+        for key in self.__slots__:
+            setattr(self, key, None)
+        self.last_seen = time.monotonic()
+        for key, value in values.items():
+            self[key] = value
+
+    def __getitem__(self, key: str) -> Any:
+        value = getattr(self, key, None) if key in self.KEYS else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.KEYS and getattr(self, key) is not None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key, None) if key in self.KEYS else None
+        return default if value is None else value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in self.KEYS if getattr(self, key) is not None}
+
+
+class MemorySessionStore:
+    def __init__(self, idle_timeout: float = DEFAULT_IDLE_TIMEOUT, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.idle_timeout = idle_timeout
+        self.max_entries = max_entries
+        # Least recently used first, so idle sessions collect at the front
+        self._sessions: "OrderedDict[int, Session]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, user_id: int) -> Session:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(user_id)
+            if session is None:
+                session = self._load(user_id) or Session()
+                self._sessions[user_id] = session
+                while len(self._sessions) > self.max_entries:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(user_id)
+            session.last_seen = now
+            return session
+
+    def clear(self, user_id: int):
+        with self._lock:
+            self._sessions.pop(user_id, None)
+
+    def save(self, user_id: int):
+        """Persist the current state of a session; no-op for the in-memory store"""
+
+    def _load(self, user_id: int) -> Optional[Session]:
+        return None
+
+    def _expire(self, now: float):
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            if now - session.last_seen < self.idle_timeout:
+                break
+            self._sessions.popitem(last=False)
+
+    def close(self):
+        pass
+
+
+class SQLiteSessionStore(MemorySessionStore):
+    """Keeps hot sessions in memory and writes each change through to a local SQLite file.
+
+    Sessions evicted from memory stay on disk and are reloaded on the user's next update.
+    """
+
+    def __init__(self, path: str, idle_timeout: float = DEFAULT_IDLE_TIMEOUT, max_entries: int = DEFAULT_MAX_ENTRIES):
+        super().__init__(idle_timeout, max_entries)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # WAL with synchronous=NORMAL keeps each write-through to a cheap append
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            'user_id INTEGER PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)')
+        self._purge()
+        self._next_purge = time.monotonic() + PURGE_INTERVAL
+
+    def save(self, user_id: int):
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is None:
+                return
+            try:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO sessions (user_id, state, updated_at) VALUES (?, ?, ?)',
+                    (user_id, json.dumps(session.to_dict(), ensure_ascii=False), time.time())
+                )
+            except sqlite3.Error as e:
+                logger.error(f"Failed to persist session for {user_id}: {e}")
+
+    def clear(self, user_id: int):
+        with self._lock:
+            super().clear(user_id)
+            try:
+                self._conn.execute('DELETE FROM sessions WHERE user_id = ?', (user_id,))
+            except sqlite3.Error as e:
+                logger.error(f"Failed to delete session for {user_id}: {e}")
+
+    def _expire(self, now: float):
+        super()._expire(now)
+        # Users who never come back would otherwise leave their rows behind until the next restart
+        if now >= self._next_purge:
+            self._next_purge = now + PURGE_INTERVAL
+            self._purge()
+
+    def _purge(self):
+        try:
+            self._conn.execute('DELETE FROM sessions WHERE updated_at < ?', (time.time() - self.idle_timeout,))
+        except sqlite3.Error as e:
+            logger.error(f"Failed to purge expired sessions: {e}")
+
+    def _load(self, user_id: int) -> Optional[Session]:
+        try:
+            row = self._conn.execute(
+                'SELECT state FROM sessions WHERE user_id = ? AND updated_at >= ?',
+                (user_id, time.time() - self.idle_timeout)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to load session for {user_id}: {e}")
+            return None
+        return Session(**json.loads(row[0])) if row else None
+
+    def close(self):
+        self._conn.close()
+
+
+def create_session_store():
+    """Build the session store selected by SESSION_BACKEND (memory or sqlite)"""
+    idle_timeout = float(os.getenv('SESSION_IDLE_TIMEOUT', DEFAULT_IDLE_TIMEOUT))
+    max_entries = int(os.getenv('SESSION_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+    backend = os.getenv('SESSION_BACKEND', 'memory').lower()
+
+    if backend == 'sqlite':
+        path = os.getenv('SESSION_DB_PATH', os.path.join(os.path.dirname(__file__), 'sessions.db'))
+        logger.info(f"Using SQLite session store at {path}")
+        return SQLiteSessionStore(path, idle_timeout, max_entries)
+    return MemorySessionStore(idle_timeout, max_entries)
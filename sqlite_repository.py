@@ -0,0 +1,235 @@
+"""
+SQLite repository for the Veterinary Dictionary Bot
+Local, network-free storage with the same interface as Firestore, an index on `id` and FTS5 search
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from repository import Repository, auto_id, numeric_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+# The trigram tokenizer cannot match terms shorter than this
+FTS_MIN_TERM_LENGTH = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    collection TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    item_id INTEGER,
+    data TEXT NOT NULL,
+    UNIQUE (collection, doc_id)
+);
+CREATE INDEX IF NOT EXISTS documents_item_id ON documents (collection, item_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(content, tokenize='trigram');
+"""
+
+
+class SQLiteDocument:
+    """Read-only document matching the parts of Firestore's DocumentSnapshot the bot uses"""
+
+    __slots__ = ('id', '_data')
+
+    def __init__(self, doc_id: str, data: Dict[str, Any]):
+        self.id = doc_id
+        self._data = data
+
+    @property
+    def exists(self) -> bool:
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self._data)
+
+
+class SQLiteRepository(Repository):
+    def __init__(self, path: str, search_fields: Dict[str, List[str]], max_workers: int = DEFAULT_MAX_WORKERS):
+        super().__init__(max_workers, 'sqlite')
+        self.path = path
+        self.search_fields = search_fields
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        # One connection shared by the pool threads; SQLite statements are short, so serialise them
+        self._lock = threading.Lock()
+
+    def _content(self, collection: str, data: Dict[str, Any]) -> str:
+        values = [data.get(field) for field in self.search_fields.get(collection, [])]
+        return '\n'.join(value.lower() for value in values if isinstance(value, str))
+
+    @staticmethod
+    def _project(data: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+        if fields is None:
+            return data
+        return {key: data[key] for key in fields if key in data}
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """BEGIN ... COMMIT, rolled back if the block raises; callers hold the lock"""
+        self._conn.execute('BEGIN')
+        try:
+            yield
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+        self._conn.execute('COMMIT')
+
+    def _insert(self, collection: str, data: Dict[str, Any]) -> str:
+        doc_id = auto_id()
+        cursor = self._conn.execute(
+            'INSERT INTO documents (collection, doc_id, item_id, data) VALUES (?, ?, ?, ?)',
+            (collection, doc_id, numeric_id(data.get('id')), json.dumps(data, ensure_ascii=False, default=str))
+        )
+        self._conn.execute(
+            'INSERT INTO documents_fts (rowid, content) VALUES (?, ?)',
+            (cursor.lastrowid, self._content(collection, data))
+        )
+        return doc_id
+
+    def _add_many(self, collection: str, items: List[Dict[str, Any]]) -> List[str]:
+        with self._lock, self._transaction():
+            return [self._insert(collection, data) for data in items]
+
+    async def add(self, collection: str, data: Dict[str, Any]) -> str:
+        return (await self.run(self._add_many, collection, [data]))[0]
+
+    async def add_many(self, collection: str, items: List[Dict[str, Any]]) -> List[str]:
+        return await self.run(self._add_many, collection, items)
+
+    def _get_row(self, collection: str, item_id: int) -> Optional[Tuple[int, str, str]]:
+        return self._conn.execute(
+            'SELECT rowid, doc_id, data FROM documents WHERE collection = ? AND item_id = ? LIMIT 1',
+            (collection, item_id)
+        ).fetchone()
+
+    def _get_by_id(self, collection: str, item_id: int) -> Optional[SQLiteDocument]:
+        with self._lock:
+            row = self._get_row(collection, item_id)
+        return SQLiteDocument(row[1], json.loads(row[2])) if row else None
+
+    async def get_by_id(self, collection: str, item_id: int) -> Optional[SQLiteDocument]:
+        return await self.run(self._get_by_id, collection, item_id)
+
+    def _update(self, collection: str, item_id: int, changes: Dict[str, Any]) -> bool:
+        with self._lock:
+            row = self._get_row(collection, item_id)
+            if row is None:
+                return False
+            rowid, _, stored = row
+            data = json.loads(stored)
+            data.update(changes)
+            with self._transaction():
+                self._conn.execute(
+                    'UPDATE documents SET data = ?, item_id = ? WHERE rowid = ?',
+                    (json.dumps(data, ensure_ascii=False, default=str), numeric_id(data.get('id')), rowid)
+                )
+                self._conn.execute(
+                    'UPDATE documents_fts SET content = ? WHERE rowid = ?',
+                    (self._content(collection, data), rowid)
+                )
+            return True
+
+    async def update(self, collection: str, item_id: int, data: Dict[str, Any]) -> bool:
+        return await self.run(self._update, collection, item_id, data)
+
+    def _delete(self, collection: str, item_id: int) -> Optional[str]:
+        with self._lock:
+            row = self._get_row(collection, item_id)
+            if row is None:
+                return None
+            rowid, doc_id, _ = row
+            with self._transaction():
+                self._conn.execute('DELETE FROM documents WHERE rowid = ?', (rowid,))
+                self._conn.execute('DELETE FROM documents_fts WHERE rowid = ?', (rowid,))
+            return doc_id
+
+    async def delete(self, collection: str, item_id: int) -> Optional[str]:
+        return await self.run(self._delete, collection, item_id)
+
+    def _page(self, collection: str, page_size: int, start_after: Optional[str], end_before: Optional[str],
+              fields: Optional[List[str]]) -> Tuple[List[SQLiteDocument], bool]:
+        with self._lock:
+            if end_before is not None:
+                rows = self._conn.execute(
+                    'SELECT doc_id, data FROM documents WHERE collection = ? AND doc_id < ? '
+                    'ORDER BY doc_id DESC LIMIT ?',
+                    (collection, end_before, page_size + 1)
+                ).fetchall()
+                has_more = len(rows) > page_size
+                rows = rows[:page_size][::-1]
+            else:
+                rows = self._conn.execute(
+                    'SELECT doc_id, data FROM documents WHERE collection = ? AND doc_id > ? '
+                    'ORDER BY doc_id LIMIT ?',
+                    (collection, start_after or '', page_size + 1)
+                ).fetchall()
+                has_more = len(rows) > page_size
+                rows = rows[:page_size]
+        return [SQLiteDocument(doc_id, self._project(json.loads(data), fields)) for doc_id, data in rows], has_more
+
+    async def page(self, collection: str, page_size: int, start_after: Optional[str] = None,
+                   end_before: Optional[str] = None, fields: Optional[List[str]] = None) -> Tuple[List[Any], bool]:
+        return await self.run(self._page, collection, page_size, start_after, end_before, fields)
+
+    def _stream(self, collection: str, fields: Optional[List[str]]) -> List[SQLiteDocument]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT doc_id, data FROM documents WHERE collection = ? ORDER BY doc_id', (collection,)
+            ).fetchall()
+        return [SQLiteDocument(doc_id, self._project(json.loads(data), fields)) for doc_id, data in rows]
+
+    async def stream(self, collection: str, fields: Optional[List[str]] = None) -> List[Any]:
+        return await self.run(self._stream, collection, fields)
+
+    def _count_all(self, collections: List[str]) -> Dict[str, int]:
+        placeholders = ', '.join('?' for _ in collections)
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT collection, COUNT(*) FROM documents WHERE collection IN ({placeholders}) GROUP BY collection',
+                collections
+            ).fetchall()
+        counts = dict.fromkeys(collections, 0)
+        counts.update(rows)
+        return counts
+
+    async def count_all(self, collections: Iterable[str]) -> Dict[str, int]:
+        return await self.run(self._count_all, list(collections))
+
+    def _search(self, collection: str, term: str, fields: List[str]) -> List[Dict[str, Any]]:
+        term = term.lower()
+        with self._lock:
+            if len(term) >= FTS_MIN_TERM_LENGTH:
+                phrase = '"' + term.replace('"', '""') + '"'
+                rows = self._conn.execute(
+                    'SELECT d.data FROM documents_fts f JOIN documents d ON d.rowid = f.rowid '
+                    'WHERE documents_fts MATCH ? AND d.collection = ? ORDER BY d.doc_id',
+                    (phrase, collection)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    'SELECT data FROM documents WHERE collection = ? ORDER BY doc_id', (collection,)
+                ).fetchall()
+
+        # FTS narrows the candidates; the final check keeps Firestore-path semantics exactly
+        results = []
+        for (data,) in rows:
+            item = self._project(json.loads(data), fields + ['id'])
+            if any(isinstance(item.get(field), str) and term in item[field].lower() for field in fields):
+                results.append(item)
+        return results
+
+    async def search(self, collection: str, term: str, fields: List[str]) -> List[Dict[str, Any]]:
+        return await self.run(self._search, collection, term, fields)
+
+    def shutdown(self, wait: bool = True):
+        # Let queued writes finish before the connection they use is closed
+        super().shutdown(wait=wait)
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,57 @@
+"""
+Live collection statistics for the Veterinary Dictionary Bot
+Maintains document counts and last-modified times from snapshot listeners so /stats needs no reads
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StatsService:
+    def __init__(self, collections: Iterable[str]):
+        self.collections = list(collections)
+        self.counts: Dict[str, int] = {}
+        self.last_modified: Dict[str, Optional[datetime]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """From now on apply updates on `loop`, so handlers read state without locking"""
+        self._loop = loop
+
+    def is_ready(self) -> bool:
+        return all(collection in self.counts for collection in self.collections)
+
+    def on_snapshot(self, collection: str, docs: List[Any], changes: List[Any], read_time: Any):
+        """CollectionWatcher subscriber; runs on the listener's background thread"""
+        count = len(docs)
+        modified = None
+        for change in changes:
+            # Removed documents carry no update time of their own; the snapshot read time stands in
+            changed_at = read_time if change.type.name == 'REMOVED' else getattr(change.document, 'update_time', None)
+            if changed_at is not None and (modified is None or changed_at > modified):
+                modified = changed_at
+
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._apply, collection, count, modified)
+        else:
+            # Before the event loop is running (initial snapshots at startup) apply directly
+            self._apply(collection, count, modified)
+
+    def _apply(self, collection: str, count: int, modified: Optional[datetime]):
+        self.counts[collection] = count
+        previous = self.last_modified.get(collection)
+        if modified is not None and (previous is None or modified > previous):
+            self.last_modified[collection] = modified
+        else:
+            self.last_modified.setdefault(collection, previous)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            collection: {'count': self.counts.get(collection, 0), 'last_modified': self.last_modified.get(collection)}
+            for collection in self.collections
+        }
@@ -0,0 +1,43 @@
+"""
+Tests for the chunked JSON array reader in bulk_import.py
+"""
+
+import json
+
+import pytest
+
+import bulk_import
+
+DOCUMENTS = [
+    [1.5, 2],
+    [12e3],
+    [-0.25],
+    [23456789, -1, 0, 3.25e-2, 1E+2],
+    [True, False, None, "a, b] [c", {"name": "x", "values": [1, 2.5]}],
+    [{"name": "word", "kurdish": "وشە", "arabic": "كلمة"}, "é\\\"", []],
+    [],
+]
+
+
+@pytest.mark.parametrize('document', DOCUMENTS, ids=[json.dumps(d, ensure_ascii=False)[:30] for d in DOCUMENTS])
+def test_json_array_at_every_chunk_size(tmp_path, monkeypatch, document):
+    path = tmp_path / 'rows.json'
+    text = json.dumps(document, ensure_ascii=False)
+    path.write_text(text, encoding='utf-8')
+    for chunk_size in range(1, len(text) + 2):
+        monkeypatch.setattr(bulk_import, 'READ_CHUNK_SIZE', chunk_size)
+        assert list(bulk_import.iter_rows(str(path), 'rows.json')) == document, f"chunk size {chunk_size}"
+
+
+def test_number_after_long_string_at_default_chunk_size(tmp_path):
+    path = tmp_path / 'rows.json'
+    path.write_text('["' + 'x' * (bulk_import.READ_CHUNK_SIZE - 7) + '",19.99]', encoding='utf-8')
+    assert list(bulk_import.iter_rows(str(path), 'rows.json'))[1] == 19.99
+
+
+def test_truncated_array_is_an_error(tmp_path, monkeypatch):
+    path = tmp_path / 'rows.json'
+    path.write_text('[1, 2', encoding='utf-8')
+    monkeypatch.setattr(bulk_import, 'READ_CHUNK_SIZE', 1)
+    with pytest.raises(ValueError):
+        list(bulk_import.iter_rows(str(path), 'rows.json'))
@@ -0,0 +1,135 @@
+"""
+Backpressure for the Veterinary Dictionary Bot
+Per-user token-bucket rate limits per action, and single-flight coalescing of identical in-flight reads
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from metrics import counter
+
+logger = logging.getLogger(__name__)
+
+# action -> (requests allowed in a burst, per this many seconds); RATE_LIMITS overrides, e.g. "stats=5/60,search=30/60",
+# and a count of 0 turns an action's limit off
+DEFAULT_LIMITS = {
+    'stats': (5, 60),
+    'search': (30, 60),
+    'export': (3, 300),
+}
+MAX_BUCKETS = 10000
+
+RATE_LIMITED = counter('vetdict_rate_limited_total', "Requests refused by a per-user rate limit", ['action'])
+COALESCED = counter('vetdict_singleflight_coalesced_total', "Calls that shared an identical in-flight call",
+                    ['operation'])
+
+
+def parse_limits(spec: Optional[str]) -> Dict[str, Tuple[int, float]]:
+    """Defaults updated from "action=count/seconds,..."; malformed entries are logged and skipped"""
+    limits = dict(DEFAULT_LIMITS)
+    for entry in (spec or '').split(','):
+        if not entry.strip():
+            continue
+        try:
+            action, rule = entry.split('=', 1)
+            count, seconds = rule.split('/', 1)
+            limits[action.strip()] = (int(count), float(seconds))
+        except ValueError:
+            logger.error(f"Ignoring malformed rate limit '{entry}'")
+    return limits
+
+
+class TokenBucket:
+    """`capacity` tokens refilled at `rate` per second.
+
+    take() refuses when empty; reserve() always succeeds and lets the balance go negative, so callers that
+    wait out the returned delay are served in the order they reserved.
+    """
+
+    __slots__ = ('capacity', 'rate', 'tokens', 'updated')
+
+    def __init__(self, capacity: int, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Spend a token; returns 0 if one was available, else the seconds until one will be"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def reserve(self, now: float) -> float:
+        """Take a token even if none is left; returns how long to wait before using it"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate) - 1
+        self.updated = now
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def pause(self, seconds: float, now: float):
+        """Hold back every reservation for at least `seconds`"""
+        self.tokens = min(self.tokens + (now - self.updated) * self.rate, 0) - seconds * self.rate
+        self.updated = now
+
+
+class RateLimiter:
+    """One token bucket per (action, user); actions without a configured limit are never limited"""
+
+    def __init__(self, limits: Dict[str, Tuple[int, float]], max_buckets: int = MAX_BUCKETS):
+        self.limits = {action: (count, count / seconds) for action, (count, seconds) in limits.items() if count > 0}
+        self.max_buckets = max_buckets
+        # Least recently used first; the oldest are dropped past max_buckets (by then they have usually refilled)
+        self._buckets: 'OrderedDict[Tuple[str, Hashable], TokenBucket]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, action: str, user_id: Hashable) -> float:
+        """0 if the user may perform `action` now, else how many seconds until they may"""
+        limit = self.limits.get(action)
+        if limit is None:
+            return 0.0
+        now = time.monotonic()
+        key = (action, user_id)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(limit[0], limit[1], now)
+                while len(self._buckets) > self.max_buckets:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            wait = bucket.take(now)
+        if wait:
+            RATE_LIMITED.labels(action).inc()
+        return wait
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one execution and its result (or exception)"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]], operation: str = 'call') -> Any:
+        future = self._calls.get(key)
+        if future is not None:
+            COALESCED.labels(operation).inc()
+            # Shielded so one waiter being cancelled doesn't cancel the shared call for the others
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(func())
+        self._calls[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                self._calls.pop(key, None)
+            else:
+                # The first caller was cancelled; keep the entry until the shared call finishes
+                future.add_done_callback(lambda _: self._calls.pop(key, None))
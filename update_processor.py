@@ -0,0 +1,90 @@
+"""
+Update processing for the Veterinary Dictionary Bot
+Runs updates from different users concurrently, up to a limit, while each user's updates run one at a time and
+in arrival order so their session state machine (e.g. `current_field`) sees inputs in the order they were sent
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict, Hashable, List, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENT = 16
+# Updates accepted (running or waiting for their user) before the fetcher is held back
+DEFAULT_MAX_PENDING = 1024
+
+
+def ordering_key(update: object) -> Optional[Hashable]:
+    """Updates with the same key run in order: the sending user, else the chat; None runs unordered"""
+    if isinstance(update, Update):
+        if update.effective_user is not None:
+            return update.effective_user.id
+        if update.effective_chat is not None:
+            return update.effective_chat.id
+    return None
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Concurrent across users, sequential per user.
+
+    An update first waits for the previous update from the same user (asyncio locks wake waiters first in,
+    first out), and only then takes one of `max_concurrent` running slots, so a user with a backlog never holds
+    slots other users could run in. Handlers registered with block=False return as soon as they are scheduled,
+    so they only keep their user's place in line until then.
+    """
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT, max_pending: int = DEFAULT_MAX_PENDING):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be a positive integer")
+        super().__init__(max(max_pending, max_concurrent, 2))
+        self.max_concurrent = max_concurrent
+        self._running = asyncio.BoundedSemaphore(max_concurrent)
+        # key -> [lock, updates holding or waiting for it]; dropped when the count reaches zero
+        self._locks: Dict[Hashable, List[Any]] = {}
+        self.active = 0
+        self.waiting = 0
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]):
+        key = ordering_key(update)
+        if key is None:
+            await self._run(coroutine)
+            return
+
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await self._run(coroutine)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+    async def _run(self, coroutine: Awaitable[Any]):
+        self.waiting += 1
+        try:
+            await self._running.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            await coroutine
+        finally:
+            self.active -= 1
+            self._running.release()
+
+    @property
+    def queued_users(self) -> int:
+        return len(self._locks)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -0,0 +1,108 @@
+"""
+Webhook server for the Veterinary Dictionary Bot
+aiohttp server that feeds Telegram updates into a python-telegram-bot Application, with a health endpoint
+"""
+
+import asyncio
+import hmac
+import logging
+import secrets
+from typing import Optional
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class WebhookServer:
+    def __init__(self, application: Application, listen: str = '0.0.0.0', port: int = 8443,
+                 path: str = '/telegram', secret_token: Optional[str] = None, webhook_url: Optional[str] = None):
+        self.application = application
+        self.listen = listen
+        self.port = port
+        self.path = '/' + path.lstrip('/')
+        # Telegram echoes this in every request; without one configured, generate a per-process secret
+        self.secret_token = secret_token or secrets.token_urlsafe(32)
+        self.webhook_url = webhook_url.rstrip('/') + self.path if webhook_url else None
+        self._stopping: Optional[asyncio.Event] = None
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle_update)
+        app.router.add_get('/healthz', self.handle_health)
+        return app
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        token = request.headers.get(SECRET_HEADER, '')
+        if not hmac.compare_digest(token.encode(), self.secret_token.encode()):
+            logger.warning(f"Rejected webhook request from {request.remote}: bad secret token")
+            return web.Response(status=403)
+
+        try:
+            payload = await request.json()
+            if not isinstance(payload, dict):
+                raise ValueError(f"expected a JSON object, got {type(payload).__name__}")
+            update_id = payload.get('update_id')
+            if not isinstance(update_id, int) or isinstance(update_id, bool):
+                raise ValueError("update_id must be an integer")
+            update = Update.de_json(payload, self.application.bot)
+            if update is None:
+                raise ValueError("empty update")
+        except Exception as e:
+            # de_json raises whatever the malformed fields trip over (AttributeError, TypeError, ...)
+            logger.warning(f"Rejected malformed webhook payload: {e!r}")
+            return web.Response(status=400)
+
+        await self.application.update_queue.put(update)
+        return web.Response()
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        running = self.application.running
+        return web.json_response(
+            {'status': 'ok' if running else 'stopped', 'pending_updates': self.application.update_queue.qsize()},
+            status=200 if running else 503
+        )
+
+    def stop(self):
+        """Make serve() shut down and return; call from the event loop"""
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def serve(self):
+        """Run the Application and the HTTP server until stop() is called or cancelled (e.g. Ctrl+C)"""
+        self._stopping = asyncio.Event()
+        runner = web.AppRunner(self.build_app())
+        async with self.application:
+            if self.application.post_init:
+                await self.application.post_init(self.application)
+
+            if self.webhook_url:
+                # Pending updates are kept, so admin actions queued during a restart are not lost
+                await self.application.bot.set_webhook(
+                    url=self.webhook_url,
+                    secret_token=self.secret_token,
+                    allowed_updates=Update.ALL_TYPES
+                )
+                logger.info(f"Webhook registered at {self.webhook_url}")
+            else:
+                logger.info("WEBHOOK_URL not set; serving locally without registering a webhook")
+
+            await self.application.start()
+            await runner.setup()
+            await web.TCPSite(runner, self.listen, self.port).start()
+            logger.info(f"Webhook server listening on {self.listen}:{self.port}{self.path}")
+
+            try:
+                await self._stopping.wait()
+                logger.info("Webhook server stopping")
+            finally:
+                await runner.cleanup()
+                await self.application.stop()
+                if self.application.post_stop:
+                    await self.application.post_stop(self.application)
+        if self.application.post_shutdown:
+            await self.application.post_shutdown(self.application)